@@ -3,7 +3,8 @@ from typing import Final
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
 
 from . import _preload_proto  # noqa: F401 # pyright: ignore[reportUnusedImport]
 from .device_data import DeviceData, DeviceOptions
@@ -29,6 +30,8 @@ ATTR_MQTT_CONNECTED = "mqtt_connected"
 ATTR_STATUS_RECONNECTS = "reconnects"
 ATTR_STATUS_PHASE = "status_phase"
 ATTR_QUOTA_REQUESTS = "quota_requests"
+ATTR_REFRESH_INTERVAL = "refresh_interval_sec"
+ATTR_STATUS_RESTORED = "restored_data"
 
 CONF_AUTH_TYPE: Final = "auth_type"
 
@@ -51,8 +54,24 @@ CONF_PARENT_SN: Final = "parent_sn"
 OPTS_DIAGNOSTIC_MODE: Final = "diagnostic_mode"
 OPTS_POWER_STEP: Final = "power_step"
 OPTS_REFRESH_PERIOD_SEC: Final = "refresh_period_sec"
+OPTS_TRACE_MODE: Final = "trace_mode"
+OPTS_TRACE_SAMPLE: Final = "trace_sample"
+OPTS_TRACE_COMMANDS: Final = "trace_commands"
+OPTS_COMPACT_PARAMS: Final = "compact_params"
+OPTS_POWER_DEADBAND: Final = "power_deadband"
+OPTS_VOLTAGE_DEADBAND: Final = "voltage_deadband"
+OPTS_CURRENT_DEADBAND: Final = "current_deadband"
+OPTS_RELATIVE_DEADBAND: Final = "relative_deadband"
+OPTS_MIN_WRITE_INTERVAL: Final = "min_write_interval"
+OPTS_MAX_STALENESS: Final = "max_staleness"
+OPTS_MIN_REFRESH_PERIOD_SEC: Final = "min_refresh_period_sec"
+OPTS_MAX_REFRESH_PERIOD_SEC: Final = "max_refresh_period_sec"
+OPTS_DIAGNOSTIC_SENSORS: Final = "diagnostic_sensors"
+# entry wide, stored next to the device list
+OPTS_CONNECT_TIMEOUT: Final = "connect_timeout"
 
 DEFAULT_REFRESH_PERIOD_SEC: Final = 5
+DEFAULT_CONNECT_TIMEOUT_SEC: Final = 30
 
 
 async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry):
@@ -137,14 +156,28 @@ async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry):
 def extract_devices(entry: ConfigEntry) -> dict[str, DeviceData]:
     result = dict[str, DeviceData]()
     for sn, data in entry.data[CONF_DEVICE_LIST].items():
+        options = entry.options[CONF_DEVICE_LIST][sn]
         result[sn] = DeviceData(
             sn,
             data[CONF_DEVICE_NAME],
             data[CONF_DEVICE_TYPE],
             DeviceOptions(
-                entry.options[CONF_DEVICE_LIST][sn][OPTS_REFRESH_PERIOD_SEC],
-                entry.options[CONF_DEVICE_LIST][sn][OPTS_POWER_STEP],
-                entry.options[CONF_DEVICE_LIST][sn][OPTS_DIAGNOSTIC_MODE],
+                options[OPTS_REFRESH_PERIOD_SEC],
+                options[OPTS_POWER_STEP],
+                options[OPTS_DIAGNOSTIC_MODE],
+                options.get(OPTS_TRACE_MODE, False),
+                options.get(OPTS_TRACE_SAMPLE, 1),
+                options.get(OPTS_TRACE_COMMANDS, ""),
+                options.get(OPTS_COMPACT_PARAMS, False),
+                options.get(OPTS_POWER_DEADBAND, 0),
+                options.get(OPTS_VOLTAGE_DEADBAND, 0),
+                options.get(OPTS_CURRENT_DEADBAND, 0),
+                options.get(OPTS_RELATIVE_DEADBAND, 0),
+                options.get(OPTS_MIN_WRITE_INTERVAL, 0),
+                options.get(OPTS_MAX_STALENESS, 300),
+                options.get(OPTS_MIN_REFRESH_PERIOD_SEC, 0),
+                options.get(OPTS_MAX_REFRESH_PERIOD_SEC, 0),
+                options.get(OPTS_DIAGNOSTIC_SENSORS, False),
             ),
             None,
             None,
@@ -189,18 +222,85 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     devices_list: dict[str, DeviceData] = extract_devices(entry)
 
-    await api_client.login()
+    from .api.credentials import CredentialsCache
+    from .devices.params_store import ParamsStore
+
+    params_store = ParamsStore(hass, entry.entry_id)
+    stored = await params_store.async_load()
+
+    credentials = CredentialsCache(hass, entry.entry_id)
+    cached_login = await credentials.async_login(api_client)
+
+    async def revalidate(refused: bool):
+        previous = api_client.mqtt_info
+        try:
+            if refused:
+                changed = await credentials.async_relogin(api_client)
+            else:
+                changed = await credentials.async_revalidate(api_client)
+        except Exception as error:
+            _LOGGER.warning("EcoFlow login failed: %s", error)
+            return
+        if not changed:
+            return
+        current = api_client.mqtt_info
+        if (current.url, current.port, current.username) != (
+            previous.url,
+            previous.port,
+            previous.username,
+        ):
+            # device topics depend on the account, set up again from the new login
+            hass.config_entries.async_schedule_reload(entry.entry_id)
+        elif api_client.mqtt_client is not None:
+            api_client.mqtt_client.update_credentials(current)
+
+    @callback
+    def on_connected():
+        if api_client.quota_over_mqtt:
+            # (re)connected: refresh everything that may have changed meanwhile
+            api_client.request_quota()
+
+    @callback
+    def on_auth_failure():
+        entry.async_create_background_task(
+            hass, revalidate(True), "ecoflow_cloud relogin"
+        )
 
     for sn, device_data in devices_list.items():
         device = api_client.configure_device(device_data)
-        device.configure(hass)
-
-    await hass.async_add_executor_job(api_client.start)
+        device.configure(hass, ParamsStore.restored_params(stored.get(sn)))
+        device.discovery.register(device.entity_factories(api_client))
+
+    connect_timeout = entry.options.get(
+        OPTS_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT_SEC
+    )
+    # connecting runs in the background, on a connection shared with entries of the same account
+    api_client.start(hass, on_auth_failure, on_connected, connect_timeout)
     hass.data[ECOFLOW_DOMAIN][entry.entry_id] = api_client
 
-    # Must load all device data before configuring devices because the data
-    # is used for entity setup.
-    await api_client.quota_all(None)
+    # setup doesn't wait for the broker, past the connect timeout this only warns
+    @callback
+    def warn_not_connected(_now):
+        if not api_client.mqtt_client.is_connected():
+            _LOGGER.warning(
+                "Not connected to the EcoFlow MQTT broker %s sec after setup, still trying",
+                connect_timeout,
+            )
+
+    entry.async_on_unload(async_call_later(hass, connect_timeout, warn_not_connected))
+    if cached_login:
+        entry.async_create_background_task(
+            hass, revalidate(False), "ecoflow_cloud revalidate login"
+        )
+    entry.async_on_unload(params_store.async_start(api_client.devices))
+
+    # Entities built from device data are added once it arrives, so the
+    # quota refresh runs in the background. Quotas requested over MQTT go
+    # out on connect.
+    if not api_client.quota_over_mqtt:
+        entry.async_create_background_task(
+            hass, api_client.quota_all(None), "ecoflow_cloud quota_all"
+        )
 
     # Forward entry setup to the platforms to set up the entities
     await hass.config_entries.async_forward_entry_setups(entry, _PLATFORMS)
@@ -219,5 +319,13 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     return True
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    from .api.credentials import CredentialsCache
+    from .devices.params_store import ParamsStore
+
+    await CredentialsCache(hass, entry.entry_id).async_remove()
+    await ParamsStore(hass, entry.entry_id).async_remove()
+
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     await hass.config_entries.async_reload(entry.entry_id)
@@ -1,12 +1,17 @@
 import logging
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from typing import Any
 
 from aiohttp import ClientResponse
-from attr import dataclass
+from homeassistant.core import HomeAssistant
+from attr import asdict, dataclass
 
+from .. import DEFAULT_CONNECT_TIMEOUT_SEC
 from ..device_data import DeviceData
 from .message import JSONMessage, Message
+from .quota_scheduler import QuotaScheduler
+from .startup_metrics import StartupMetrics
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,6 +34,8 @@ class EcoflowApiClient(ABC):
         self.mqtt_info: EcoflowMqttInfo
         self.devices: dict[str, Any] = {}
         self.mqtt_client = None
+        self.startup_metrics = StartupMetrics()
+        self.quota_scheduler: QuotaScheduler | None = None
 
     @abstractmethod
     async def login(self):
@@ -38,6 +45,9 @@ class EcoflowApiClient(ABC):
     async def fetch_all_available_devices(self):
         pass
 
+    # quota requests go over MQTT and can only be sent once connected
+    quota_over_mqtt = False
+
     @abstractmethod
     async def quota_all(self, device_sn: str | None):
         pass
@@ -46,11 +56,42 @@ class EcoflowApiClient(ABC):
     def configure_device(self, device_data: DeviceData):
         pass
 
+    def credentials(self) -> dict[str, Any]:
+        """Login result needed to connect without logging in again."""
+        return {"mqtt": asdict(self.mqtt_info)}
+
+    def restore_credentials(self, credentials: dict[str, Any]) -> bool:
+        try:
+            self.mqtt_info = EcoflowMqttInfo(**credentials["mqtt"])
+        except (KeyError, TypeError):
+            return False
+        return self.mqtt_info.client_id is not None
+
+    def quota_key(self, device_sn: str) -> str:
+        """Devices with the same key are refreshed by the same quota request."""
+        return device_sn
+
+    def request_quota(self, device_sn: str | None = None) -> bool:
+        """Schedule a quota refresh of one or all devices, False if nothing new was queued."""
+        if self.quota_scheduler is None:
+            return False
+        targets = [device_sn] if device_sn else list(self.devices.keys())
+        queued = [self.quota_scheduler.request(sn) for sn in targets]
+        return any(queued)
+
     def add_device(self, device):
         self.devices[device.device_data.sn] = device
+        if self.mqtt_client is not None:
+            self.mqtt_client.update_subscriptions()
 
     def remove_device(self, device):
         self.devices.pop(device.device_data.sn, None)
+        if self.mqtt_client is not None:
+            self.mqtt_client.update_subscriptions()
+
+    def mqtt_account(self) -> str | None:
+        """Topic level identifying the account, device topics under it may be subscribed with wildcards."""
+        return None
 
     def _accept_mqqt_certification(self, resp_json: dict):
         _LOGGER.info(f"Received MQTT credentials: {resp_json}")
@@ -95,21 +136,57 @@ class EcoflowApiClient(ABC):
         )
 
     def send_set_message(
-        self, device_sn: str, mqtt_state: dict[str, Any], command: dict | Message
+        self,
+        device_sn: str,
+        mqtt_state: dict[str, Any],
+        command: dict | Message,
+        previous: dict[str, Any] | None = None,
     ):
+        """Publish a set command, `previous` is passed when the target state is already applied."""
         if isinstance(command, dict):
             command = JSONMessage(command)
 
-        self.devices[device_sn].data.update_to_target_state(mqtt_state)
-        self.mqtt_client.publish(
-            self.devices[device_sn].device_info.set_topic, command.to_mqtt_payload()
-        )
-
-    def start(self):
+        device = self.devices[device_sn]
+        if previous is None:
+            previous = device.data.update_to_target_state(mqtt_state)
+        self.mqtt_client.publish(device.device_info.set_topic, command.to_mqtt_payload())
+        device.command_tracker.track(command.message_id, mqtt_state, previous)
+
+    def start(
+        self,
+        hass: HomeAssistant,
+        on_auth_failure: Callable[[], None] | None = None,
+        on_connected: Callable[[], None] | None = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SEC,
+    ):
+        """Attach the MQTT session, the connection is made in the background."""
+        self.quota_scheduler = QuotaScheduler(hass, self.quota_all, self.quota_key)
         from custom_components.ecoflow_cloud.api.ecoflow_mqtt import EcoflowMQTTClient
 
-        self.mqtt_client = EcoflowMQTTClient(self.mqtt_info, self.devices)
+        def connected():
+            self.startup_metrics.mark_connected()
+            if on_connected is not None:
+                on_connected()
+
+        self.mqtt_client = EcoflowMQTTClient(
+            hass,
+            self.mqtt_info,
+            self.devices,
+            on_auth_failure,
+            connected,
+            connect_timeout,
+            self.mqtt_account(),
+        )
 
     def stop(self):
         assert self.mqtt_client is not None
+        if self.quota_scheduler is not None:
+            self.quota_scheduler.stop()
+        for device in self.devices.values():
+            if device.commands is not None:
+                device.commands.flush_all()
+            if device.discovery is not None:
+                device.discovery.stop()
+            if device.unmapped_keys is not None:
+                device.unmapped_keys.stop()
         self.mqtt_client.stop()
@@ -0,0 +1,100 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt
+
+from . import EcoflowApiClient
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+CREDENTIALS_TTL = datetime.timedelta(days=1)
+# the broker retries a refused connection every few seconds, don't login for each retry
+MIN_RELOGIN_INTERVAL_SEC = 300.0
+
+
+class CredentialsCache:
+    """
+    Login result (token, user id, MQTT credentials) of one config entry, kept in HA storage.
+
+    On setup the client is restored from a cached login younger than `ttl`
+    so MQTT can connect without waiting for the login/certification calls,
+    and the login is revalidated in the background. Keeping the cached MQTT
+    client id also keeps restarts from using up the daily client id limit.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        ttl: datetime.timedelta = CREDENTIALS_TTL,
+    ):
+        self.ttl = ttl
+        self.__store = Store[dict[str, Any]](
+            hass, STORAGE_VERSION, f"ecoflow_cloud.credentials.{entry_id}"
+        )
+        self.__lock = asyncio.Lock()
+        self.__last_login = 0.0
+
+    async def async_login(self, api_client: EcoflowApiClient) -> bool:
+        """Restore the client from the cache or login, True if the cache was used."""
+        cached = await self.__async_load()
+        if cached is not None and api_client.restore_credentials(cached):
+            _LOGGER.info("Using cached EcoFlow login")
+            return True
+
+        await api_client.login()
+        self.__last_login = time.monotonic()
+        await self.__async_save(api_client)
+        return False
+
+    async def async_revalidate(self, api_client: EcoflowApiClient) -> bool:
+        """Login again keeping the MQTT client id, True if the MQTT credentials changed."""
+        async with self.__lock:
+            previous = api_client.mqtt_info
+            await api_client.login()
+            self.__last_login = time.monotonic()
+            api_client.mqtt_info.client_id = previous.client_id
+            await self.__async_save(api_client)
+            return api_client.mqtt_info != previous
+
+    async def async_relogin(self, api_client: EcoflowApiClient) -> bool:
+        """Revalidate after the broker refused the credentials, at most every MIN_RELOGIN_INTERVAL_SEC."""
+        if self.__lock.locked():
+            return False
+        if time.monotonic() - self.__last_login < MIN_RELOGIN_INTERVAL_SEC:
+            return False
+        await self.async_remove()
+        return await self.async_revalidate(api_client)
+
+    async def async_remove(self):
+        await self.__store.async_remove()
+
+    async def __async_load(self) -> dict[str, Any] | None:
+        try:
+            stored = await self.__store.async_load()
+        except Exception as error:
+            _LOGGER.warning("Can't load cached login: %s", error)
+            return None
+        if not stored:
+            return None
+        login_time = dt.parse_datetime(stored.get("time", ""))
+        if login_time is None or dt.utcnow() - login_time > self.ttl:
+            return None
+        return stored.get("credentials")
+
+    async def __async_save(self, api_client: EcoflowApiClient):
+        try:
+            await self.__store.async_save(
+                {
+                    "time": dt.utcnow().isoformat(),
+                    "credentials": api_client.credentials(),
+                }
+            )
+        except Exception as error:
+            _LOGGER.warning("Can't cache login: %s", error)
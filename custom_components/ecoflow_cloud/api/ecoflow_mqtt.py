@@ -1,144 +1,146 @@
 import logging
-import ssl
-import time
-from _socket import SocketType
-from typing import Any
+from collections.abc import Callable
 
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, callback
 from paho.mqtt.client import MQTTMessage, PayloadType
 
-from ..devices import BaseDevice
+from .. import DEFAULT_CONNECT_TIMEOUT_SEC
+from ..devices import BaseDevice, SubDeviceRouter
 from . import EcoflowMqttInfo
+from .mqtt_transport import MqttTransport
+from .publish_scheduler import PublishScheduler
+from .reconnect import ReconnectSupervisor
+from .subscriptions import SubscriptionPlanner
 
 _LOGGER = logging.getLogger(__name__)
 
+# CONNACK codes of MQTT 3.1.1 and 5 for refused credentials
+_AUTH_FAILURES = (4, 5, 134, 135)
 
-class EcoflowMQTTClient:
-    def __init__(self, mqtt_info: EcoflowMqttInfo, devices: dict[str, BaseDevice]):
-        from ..devices import BaseDevice
 
-        self.connected = False
+class EcoflowMQTTClient:
+    """The MQTT session of one config entry on a (possibly shared) MqttTransport."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        mqtt_info: EcoflowMqttInfo,
+        devices: dict[str, BaseDevice],
+        on_auth_failure: Callable[[], None] | None = None,
+        on_connected: Callable[[], None] | None = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SEC,
+        account: str | None = None,
+    ):
+        # called when the broker refuses the credentials
+        self.on_auth_failure = on_auth_failure
+        # called after every successful connect and subscribe
+        self.on_connected = on_connected
         self.__mqtt_info = mqtt_info
         self.__devices: dict[str, BaseDevice] = devices
+        self.__routes: dict[str, BaseDevice | SubDeviceRouter] = {}
+        self.__build_routes()
 
-        from homeassistant.components.mqtt.async_client import AsyncMQTTClient
+        self.__planner = SubscriptionPlanner(account)
+        self.__topics = self.__planner.plan(self.__devices.values())
+        self.__transport = MqttTransport.acquire(hass, mqtt_info, connect_timeout)
+        self.__transport.attach(self)
 
-        self.__client: AsyncMQTTClient = AsyncMQTTClient(
-            client_id=self.__mqtt_info.client_id,
-            reconnect_on_failure=True,
-            clean_session=True,
-        )
+    @property
+    def connected(self) -> bool:
+        return self.__transport.connected
 
-        # self.__client._connect_timeout = 15.0
-        self.__client.setup()
-        self.__client.username_pw_set(
-            self.__mqtt_info.username, self.__mqtt_info.password
-        )
-        self.__client.tls_set(certfile=None, keyfile=None, cert_reqs=ssl.CERT_REQUIRED)
-        self.__client.tls_insecure_set(False)
-        self.__client.on_connect = self._on_connect
-        self.__client.on_disconnect = self._on_disconnect
-        self.__client.on_message = self._on_message
-        self.__client.on_socket_close = self._on_socket_close
-
-        _LOGGER.info(
-            f"Connecting to MQTT Broker {self.__mqtt_info.url}:{self.__mqtt_info.port} with client id {self.__mqtt_info.client_id} and username {self.__mqtt_info.username}"
-        )
-        self.__client.connect(self.__mqtt_info.url, self.__mqtt_info.port, keepalive=15)
-        self.__client.loop_start()
+    @property
+    def publish_scheduler(self) -> PublishScheduler:
+        return self.__transport.publish_scheduler
+
+    @property
+    def reconnect_supervisor(self) -> ReconnectSupervisor:
+        return self.__transport.reconnect_supervisor
 
     def is_connected(self):
-        return self.__client.is_connected()
+        return self.__transport.is_connected()
 
     def reconnect(self) -> bool:
-        try:
-            _LOGGER.info(
-                f"Re-connecting to MQTT Broker {self.__mqtt_info.url}:{self.__mqtt_info.port}"
-            )
-            self.__client.loop_stop(True)
-            self.__client.reconnect()
-            self.__client.loop_start()
-            return True
-        except Exception as e:
-            _LOGGER.error(e)
-            return False
+        # never blocks the caller; returns False if a reconnect is already running
+        return self.__transport.reconnect()
+
+    def update_credentials(self, mqtt_info: EcoflowMqttInfo):
+        """Use new username/password from the next (re)connect on, same broker and client id."""
+        self.__mqtt_info = mqtt_info
+        self.__transport.update_credentials(mqtt_info)
+
+    def topics(self) -> list[str]:
+        return self.__topics
 
     @callback
-    def _on_socket_close(self, client, userdata: Any, sock: SocketType) -> None:
-        _LOGGER.error(f"Unexpected MQTT Socket disconnection : {str(sock)}")
+    def update_subscriptions(self):
+        """Subscribe/unsubscribe the difference after devices were added or removed."""
+        self.__build_routes()
+        topics = self.__planner.plan(self.__devices.values())
+        added = [topic for topic in topics if topic not in self.__topics]
+        removed = [topic for topic in self.__topics if topic not in topics]
+        self.__topics = topics
+        if added:
+            self.__transport.subscribe(added)
+        if removed:
+            self.__transport.unsubscribe(removed)
 
     @callback
-    def _on_connect(self, client, userdata, flags, rc):
-        if rc == 0:
-            self.connected = True
-            target_topics = [(topic, 1) for topic in self.__target_topics()]
-            self.__client.subscribe(target_topics)
-            _LOGGER.info(f"Subscribed to MQTT topics {target_topics}")
-        else:
-            self.__log_with_reason("connect", client, userdata, rc)
+    def handle_subscribe_refused(self, topics: list[str]):
+        own = [topic for topic in topics if topic in self.__topics]
+        if own and self.__planner.refused(own):
+            self.update_subscriptions()
 
     @callback
-    def _on_disconnect(self, client, userdata, rc):
-        if not self.connected:
-            # from homeassistant/components/mqtt/client.py
-            # This function is re-entrant and may be called multiple times
-            # when there is a broken pipe error.
-            return
-        self.connected = False
-        if rc != 0:
-            self.__log_with_reason("disconnect", client, userdata, rc)
-            time.sleep(5)
+    def handle_connect(self):
+        self.__build_routes()
+        if self.on_connected is not None:
+            self.on_connected()
 
     @callback
-    def _on_message(self, client, userdata, message: MQTTMessage):
+    def handle_refused(self, rc):
+        self.__log_with_reason("connect", rc)
+        if rc in _AUTH_FAILURES and self.on_auth_failure is not None:
+            self.on_auth_failure()
+
+    @callback
+    def handle_disconnect(self, rc):
+        self.__log_with_reason("disconnect", rc)
+
+    @callback
+    def handle_message(self, message: MQTTMessage) -> bool:
+        route = self.__routes.get(message.topic)
+        if route is None:
+            return False
         try:
-            for sn, device in self.__devices.items():
-                if device.update_data(message.payload, message.topic):
-                    _LOGGER.debug(
-                        f"Message for {sn} and Topic {message.topic} : {message.payload}"
-                    )
+            if route.update_data(message.payload, message.topic):
+                _LOGGER.debug("Message for Topic %s", message.topic)
         except UnicodeDecodeError as error:
             _LOGGER.error(
                 f"UnicodeDecodeError: {error}. Ignoring message and waiting for the next one."
             )
+        return True
 
     def stop(self):
-        self.__client.unsubscribe(self.__target_topics())
-        self.__client.loop_stop()
-        self.__client.disconnect()
+        self.__transport.detach(self)
 
-    def __log_with_reason(self, action: str, client, userdata, rc):
+    def __log_with_reason(self, action: str, rc):
         import paho.mqtt.client as mqtt_client
 
         _LOGGER.error(
-            f"MQTT {action}: {mqtt_client.error_string(rc)} ({self.__mqtt_info.client_id}) - {userdata}"
+            f"MQTT {action}: {mqtt_client.error_string(rc)} ({self.__mqtt_info.client_id})"
         )
 
     def publish(self, topic: str, message: PayloadType) -> None:
-        try:
-            info = self.__client.publish(topic, message, 1)
-            _LOGGER.debug(
-                "Sending "
-                + str(message)
-                + " :"
-                + str(info)
-                + "("
-                + str(info.is_published())
-                + ")"
-            )
-        except RuntimeError as error:
-            _LOGGER.error(
-                error, "Error on topic " + topic + " and message " + str(message)
-            )
-        except Exception as error:
-            _LOGGER.debug(
-                error, "Error on topic " + topic + " and message " + str(message)
-            )
+        self.__transport.publish(topic, message)
 
-    def __target_topics(self) -> list[str]:
-        topics = []
+    def __build_routes(self):
+        topic_devices: dict[str, list[BaseDevice]] = {}
         for device in self.__devices.values():
             for topic in device.device_info.topics():
-                topics.append(topic)
-        # Remove duplicates that can occur when multiple devices have the same topic (for example sub devices)
-        return list(set(topics))
+                topic_devices.setdefault(topic, []).append(device)
+
+        routes: dict[str, BaseDevice | SubDeviceRouter] = {}
+        for topic, devices in topic_devices.items():
+            routes[topic] = devices[0] if len(devices) == 1 else SubDeviceRouter(devices)
+        self.__routes = routes
@@ -7,6 +7,9 @@ from paho.mqtt.client import PayloadType
 
 
 class Message(ABC):
+    # id/seq of the last generated payload, used to match the set_reply
+    message_id: str | None = None
+
     @abstractmethod
     def to_mqtt_payload(self) -> PayloadType:
         raise NotImplementedError()
@@ -37,4 +40,6 @@ class JSONMessage(Message):
 
     @override
     def to_mqtt_payload(self) -> PayloadType:
-        return json.dumps(JSONMessage.prepare_payload(self.data))
+        payload = JSONMessage.prepare_payload(self.data)
+        self.message_id = str(payload["id"])
+        return json.dumps(payload)
@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import collections
+import logging
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util.ssl import client_context
+from paho.mqtt.client import MQTT_ERR_SUCCESS, MQTTMessage, PayloadType
+
+from .. import DEFAULT_CONNECT_TIMEOUT_SEC
+from . import EcoflowMqttInfo
+from .publish_scheduler import PublishScheduler
+from .reconnect import ReconnectSupervisor
+
+if TYPE_CHECKING:
+    from .ecoflow_mqtt import EcoflowMQTTClient
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_MQTT_TRANSPORTS = "ecoflow_cloud_mqtt_transports"
+
+# packets handled per socket read callback, the rest waits for the next one
+MAX_PACKETS_TO_READ = 500
+MISC_LOOP_INTERVAL_SEC = 1.0
+
+
+class MqttTransport:
+    """
+    One MQTT connection driven by the HA event loop, shared by all config
+    entries logged in with the same broker account.
+
+    There is no paho network thread: socket reads and writes run from loop
+    reader/writer callbacks and keepalive from a timer, the same way HA's own
+    MQTT client does it. Only the blocking connect (DNS, TCP, TLS handshake)
+    runs in the executor. Entries attach an EcoflowMQTTClient session, which
+    gets the messages of its topics.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        key: tuple[str, int, str],
+        mqtt_info: EcoflowMqttInfo,
+        connect_timeout: float,
+    ):
+        from homeassistant.components.mqtt.async_client import AsyncMQTTClient
+
+        self.__hass = hass
+        self.__key = key
+        self.__mqtt_info = mqtt_info
+        self.__sessions: list[EcoflowMQTTClient] = []
+        self.__topics = collections.Counter[str]()
+        self.__pending_subscribes: dict[int, list[str]] = {}
+        self.__fileno: int | None = None
+        self.__misc_timer: Any = None
+        self.__stopped = False
+        self.__connecting = False
+        self.connected = False
+
+        self.__client = AsyncMQTTClient(
+            client_id=mqtt_info.client_id,
+            reconnect_on_failure=False,
+            clean_session=True,
+        )
+        self.__client.connect_timeout = connect_timeout
+        self.__client.setup()
+        self.__client.username_pw_set(mqtt_info.username, mqtt_info.password)
+        self.__client.tls_set_context(client_context())
+        self.__client.on_connect = self._on_connect
+        self.__client.on_disconnect = self._on_disconnect
+        self.__client.on_message = self._on_message
+        self.__client.on_publish = self._on_publish
+        self.__client.on_subscribe = self._on_subscribe
+        self.__client.on_socket_open = self._on_socket_open
+        self.__client.on_socket_close = self._on_socket_close
+        self.__client.on_socket_register_write = self._on_socket_register_write
+        self.__client.on_socket_unregister_write = self._on_socket_unregister_write
+
+        self.publish_scheduler = PublishScheduler(
+            lambda topic, message: self.__client.publish(topic, message, 1),
+            self.is_connected,
+        )
+        self.reconnect_supervisor = ReconnectSupervisor(
+            hass, f"{mqtt_info.url}:{mqtt_info.port}", self.__async_connect
+        )
+
+    @staticmethod
+    @callback
+    def acquire(
+        hass: HomeAssistant,
+        mqtt_info: EcoflowMqttInfo,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT_SEC,
+    ) -> MqttTransport:
+        transports: dict[tuple[str, int, str], MqttTransport] = hass.data.setdefault(
+            DATA_MQTT_TRANSPORTS, {}
+        )
+        key = (mqtt_info.url, mqtt_info.port, mqtt_info.username)
+        transport = transports.get(key)
+        if transport is None:
+            transport = transports[key] = MqttTransport(
+                hass, key, mqtt_info, connect_timeout
+            )
+        return transport
+
+    def is_connected(self) -> bool:
+        return self.connected and self.__client.is_connected()
+
+    @callback
+    def attach(self, session: EcoflowMQTTClient):
+        self.__sessions.append(session)
+        self.subscribe(session.topics())
+        if len(self.__sessions) == 1:
+            _LOGGER.info(
+                f"Connecting to MQTT Broker {self.__mqtt_info.url}:{self.__mqtt_info.port} with client id {self.__mqtt_info.client_id} and username {self.__mqtt_info.username}"
+            )
+            self.reconnect_supervisor.request(lost=True)
+        elif self.is_connected():
+            session.handle_connect()
+
+    @callback
+    def detach(self, session: EcoflowMQTTClient):
+        if session not in self.__sessions:
+            return
+        self.__sessions.remove(session)
+        self.unsubscribe(session.topics())
+        if not self.__sessions:
+            self.__stop()
+
+    @callback
+    def update_credentials(self, mqtt_info: EcoflowMqttInfo):
+        """Use a new password from the next (re)connect on, same broker, account and client id."""
+        self.__mqtt_info = mqtt_info
+        self.__client.username_pw_set(mqtt_info.username, mqtt_info.password)
+        if not self.is_connected():
+            self.reconnect_supervisor.request(lost=True)
+
+    @callback
+    def reconnect(self) -> bool:
+        return self.reconnect_supervisor.request()
+
+    @callback
+    def publish(self, topic: str, message: PayloadType):
+        self.publish_scheduler.submit(topic, message)
+
+    @callback
+    def subscribe(self, topics: list[str]):
+        """Add topics of a session, only topics no other session uses yet go to the broker."""
+        new_topics = [topic for topic in topics if self.__topics[topic] == 0]
+        self.__topics.update(topics)
+        if new_topics and self.is_connected():
+            self.__subscribe(new_topics)
+
+    @callback
+    def unsubscribe(self, topics: list[str]):
+        self.__topics.subtract(topics)
+        unused = [topic for topic in topics if self.__topics[topic] <= 0]
+        for topic in unused:
+            del self.__topics[topic]
+        if unused and self.is_connected():
+            self.__client.unsubscribe(unused)
+            _LOGGER.info(f"Unsubscribed from MQTT topics {unused}")
+
+    @callback
+    def __subscribe(self, topics: list[str]):
+        result, mid = self.__client.subscribe([(topic, 1) for topic in topics])
+        if result == MQTT_ERR_SUCCESS:
+            self.__pending_subscribes[mid] = topics
+        _LOGGER.info(f"Subscribed to MQTT topics {topics}")
+
+    async def __async_connect(self):
+        # the old socket must not be read while the executor replaces it
+        self.__unregister_socket()
+        self.__connecting = True
+        try:
+            await self.__hass.async_add_executor_job(
+                self.__client.connect,
+                self.__mqtt_info.url,
+                self.__mqtt_info.port,
+                15,
+            )
+        finally:
+            self.__connecting = False
+
+    @callback
+    def __stop(self):
+        self.__stopped = True
+        transports = self.__hass.data.get(DATA_MQTT_TRANSPORTS, {})
+        if transports.get(self.__key) is self:
+            del transports[self.__key]
+        self.reconnect_supervisor.stop()
+        if self.__misc_timer is not None:
+            self.__misc_timer.cancel()
+            self.__misc_timer = None
+        # the DISCONNECT packet goes out from the writer callback, which then closes the socket
+        self.__client.disconnect()
+
+    def __on_loop(self, func: Callable[..., None], *args: Any):
+        # paho calls the socket callbacks from the executor while connecting
+        if threading.get_ident() == self.__hass.loop_thread_id:
+            func(*args)
+        else:
+            self.__hass.loop.call_soon_threadsafe(func, *args)
+
+    def _on_socket_open(self, client, userdata: Any, sock) -> None:
+        self.__on_loop(self.__async_socket_open, sock.fileno())
+
+    def _on_socket_close(self, client, userdata: Any, sock) -> None:
+        self.__on_loop(self.__async_socket_close, sock.fileno())
+
+    def _on_socket_register_write(self, client, userdata: Any, sock) -> None:
+        self.__on_loop(self.__async_register_write, sock.fileno())
+
+    def _on_socket_unregister_write(self, client, userdata: Any, sock) -> None:
+        self.__on_loop(self.__async_unregister_write, sock.fileno())
+
+    @callback
+    def __async_socket_open(self, fileno: int):
+        if fileno < 0:
+            return
+        self.__unregister_socket()
+        self.__fileno = fileno
+        self.__hass.loop.add_reader(fileno, self.__async_read)
+        if self.__misc_timer is None:
+            self.__misc_timer = self.__hass.loop.call_later(
+                MISC_LOOP_INTERVAL_SEC, self.__async_misc
+            )
+        # consume what arrived while the socket wasn't registered yet
+        self.__async_read()
+
+    @callback
+    def __async_socket_close(self, fileno: int):
+        if fileno == self.__fileno:
+            self.__unregister_socket()
+        if self.__stopped and self.__misc_timer is not None:
+            self.__misc_timer.cancel()
+            self.__misc_timer = None
+
+    @callback
+    def __async_register_write(self, fileno: int):
+        if fileno == self.__fileno:
+            self.__hass.loop.add_writer(fileno, self.__async_write)
+
+    @callback
+    def __async_unregister_write(self, fileno: int):
+        if fileno == self.__fileno:
+            self.__hass.loop.remove_writer(fileno)
+
+    @callback
+    def __unregister_socket(self):
+        if self.__fileno is not None:
+            self.__hass.loop.remove_reader(self.__fileno)
+            self.__hass.loop.remove_writer(self.__fileno)
+            self.__fileno = None
+
+    @callback
+    def __async_read(self):
+        status = self.__client.loop_read(MAX_PACKETS_TO_READ)
+        if status != MQTT_ERR_SUCCESS:
+            _LOGGER.debug("MQTT read from %s failed: %s", self.__key[0], status)
+
+    @callback
+    def __async_write(self):
+        status = self.__client.loop_write()
+        if status != MQTT_ERR_SUCCESS:
+            _LOGGER.debug("MQTT write to %s failed: %s", self.__key[0], status)
+
+    @callback
+    def __async_misc(self):
+        self.__misc_timer = None
+        if self.__stopped:
+            return
+        if not self.__connecting:
+            self.__client.loop_misc()
+        self.__misc_timer = self.__hass.loop.call_later(
+            MISC_LOOP_INTERVAL_SEC, self.__async_misc
+        )
+
+    @callback
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.connected = True
+            self.reconnect_supervisor.connected()
+            self.__pending_subscribes.clear()
+            if self.__topics:
+                self.__subscribe(list(self.__topics))
+            for session in list(self.__sessions):
+                session.handle_connect()
+            self.publish_scheduler.pump()
+        else:
+            for session in list(self.__sessions):
+                session.handle_refused(rc)
+
+    @callback
+    def _on_disconnect(self, client, userdata, rc):
+        if not self.connected and rc == 0:
+            return
+        was_connected, self.connected = self.connected, False
+        if was_connected:
+            self.reconnect_supervisor.disconnected()
+        if rc != 0:
+            for session in list(self.__sessions):
+                session.handle_disconnect(rc)
+        if not self.__stopped:
+            self.reconnect_supervisor.request(lost=True)
+
+    @callback
+    def _on_subscribe(self, client, userdata, mid, granted_qos):
+        topics = self.__pending_subscribes.pop(mid, [])
+        # 0x80 in the SUBACK: the broker (ACL) refused the topic
+        refused = [topic for topic, qos in zip(topics, granted_qos) if qos >= 0x80]
+        if refused:
+            _LOGGER.warning(f"MQTT broker refused subscriptions {refused}")
+            for session in list(self.__sessions):
+                session.handle_subscribe_refused(refused)
+
+    @callback
+    def _on_publish(self, client, userdata, mid):
+        self.publish_scheduler.acked(mid)
+
+    @callback
+    def _on_message(self, client, userdata, message: MQTTMessage):
+        for session in self.__sessions:
+            if session.handle_message(message):
+                return
@@ -23,6 +23,8 @@ class PrivateAPIMessageProtocol(Protocol):
 
 
 class EcoflowPrivateApiClient(EcoflowApiClient):
+    quota_over_mqtt = True
+
     def __init__(
         self, api_domain: str, ecoflow_username: str, ecoflow_password: str, group: str
     ):
@@ -71,6 +73,31 @@ class EcoflowPrivateApiClient(EcoflowApiClient):
                 f"ANDROID_{str(uuid.random_uuid_hex()).upper()}_{self.user_id}"
             )
 
+    def credentials(self) -> dict[str, Any]:
+        return super().credentials() | {
+            "token": self.token,
+            "user_id": self.user_id,
+            "user_name": self.user_name,
+        }
+
+    def restore_credentials(self, credentials: dict[str, Any]) -> bool:
+        if not credentials.get("user_id") or not credentials.get("token"):
+            return False
+        if not super().restore_credentials(credentials):
+            return False
+        self.token = credentials["token"]
+        self.user_id = credentials["user_id"]
+        self.user_name = credentials.get("user_name")
+        return True
+
+    def quota_key(self, device_sn: str) -> str:
+        # sub devices get their data from the parent's quota reply
+        device = self.devices.get(device_sn)
+        return device.device_info.sn if device is not None else device_sn
+
+    def mqtt_account(self) -> str | None:
+        return str(self.user_id) if self.user_id else None
+
     # Failed to connect to MQTT: not authorised
     def gen_client_id(self):
         base = f"ANDROID_{str(uuid.random_uuid_hex()).upper()}_{self.user_id}"
@@ -176,13 +203,20 @@ class EcoflowPrivateApiClient(EcoflowApiClient):
             super().send_get_message(device_sn, command)
 
     def send_set_message(
-        self, device_sn: str, mqtt_state: dict[str, Any], command: dict | Message
+        self,
+        device_sn: str,
+        mqtt_state: dict[str, Any],
+        command: dict | Message,
+        previous: dict[str, Any] | None = None,
     ):
         if isinstance(command, PrivateAPIMessageProtocol):
-            self.devices[device_sn].data.update_to_target_state(mqtt_state)
+            device = self.devices[device_sn]
+            if previous is None:
+                previous = device.data.update_to_target_state(mqtt_state)
             self.mqtt_client.publish(
-                self.devices[device_sn].device_info.set_topic,
+                device.device_info.set_topic,
                 command.private_api_to_mqtt_payload(),
             )
+            device.command_tracker.track(command.message_id, mqtt_state, previous)
         else:
-            super().send_set_message(device_sn, mqtt_state, command)
+            super().send_set_message(device_sn, mqtt_state, command, previous)
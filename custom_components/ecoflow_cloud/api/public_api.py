@@ -38,6 +38,9 @@ class EcoflowPublicApiClient(EcoflowApiClient):
             f"Hassio-{self.mqtt_info.username}-{self.group.replace(' ', '-')}"
         )
 
+    def mqtt_account(self) -> str | None:
+        return self.mqtt_info.username
+
     async def fetch_all_available_devices(self) -> list[EcoflowDeviceInfo]:
         _LOGGER.info("Requesting all devices")
         response = await self.call_api("/device/list")
@@ -92,7 +95,8 @@ class EcoflowPublicApiClient(EcoflowApiClient):
 
     async def quota_all(self, device_sn: str | None):
         if not device_sn:
-            target_devices = self.devices.keys()
+            # PowerKit modules can be added while the quotas are fetched
+            target_devices = list(self.devices.keys())
             # update all statuses
             devices = await self.fetch_all_available_devices()
             for device in devices:
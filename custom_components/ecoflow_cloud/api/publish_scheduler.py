@@ -0,0 +1,138 @@
+import collections
+import dataclasses
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from paho.mqtt.client import MQTTMessageInfo, PayloadType
+
+from ..devices.command_tracker import LatencyHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_IN_FLIGHT_WINDOW = 10
+DEFAULT_MESSAGE_TTL_SEC = 30.0
+DEFAULT_MAX_QUEUE = 100
+
+
+@dataclasses.dataclass
+class _QueuedMessage:
+    topic: str
+    payload: PayloadType
+    enqueued: float
+    ttl: float
+
+
+class PublishScheduler:
+    """
+    Keeps at most `in_flight_window` unacknowledged QoS 1 publishes in paho.
+
+    Everything else waits in a bounded queue. Messages whose TTL passed while
+    waiting (e.g. during a broker outage) are dropped instead of being replayed.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[str, PayloadType], MQTTMessageInfo],
+        is_connected: Callable[[], bool],
+        in_flight_window: int = DEFAULT_IN_FLIGHT_WINDOW,
+        ttl: float = DEFAULT_MESSAGE_TTL_SEC,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        self.__publish = publish
+        self.__is_connected = is_connected
+        self.in_flight_window = in_flight_window
+        self.ttl = ttl
+        self.max_queue = max_queue
+
+        self.__lock = threading.Lock()
+        self.__queue = collections.deque[_QueuedMessage]()
+        self.__in_flight: dict[int, float] = {}
+        # acks that arrived before publish() returned the mid
+        self.__early_acks: dict[int, float] = {}
+        # messages taken from the queue whose mid isn't known yet
+        self.__reserved = 0
+
+        self.ack_latency = LatencyHistogram()
+        self.published = 0
+        self.expired = 0
+        self.overflowed = 0
+
+    def submit(self, topic: str, payload: PayloadType, ttl: float | None = None):
+        with self.__lock:
+            if len(self.__queue) >= self.max_queue:
+                self.__queue.popleft()
+                self.overflowed += 1
+            self.__queue.append(
+                _QueuedMessage(topic, payload, time.monotonic(), ttl or self.ttl)
+            )
+        self.pump()
+
+    def acked(self, mid: int):
+        now = time.monotonic()
+        with self.__lock:
+            sent = self.__in_flight.pop(mid, None)
+            if sent is None:
+                self.__early_acks[mid] = now
+            else:
+                self.ack_latency.record(now - sent)
+        self.pump()
+
+    def pump(self):
+        if not self.__is_connected():
+            return
+        while True:
+            message = self.__next_message()
+            if message is None:
+                return
+            sent = time.monotonic()
+            try:
+                info = self.__publish(message.topic, message.payload)
+            except Exception as error:
+                _LOGGER.error("Error on topic %s: %s", message.topic, error)
+                with self.__lock:
+                    self.__reserved -= 1
+                continue
+            _LOGGER.debug("Sending to %s (mid %s)", message.topic, info.mid)
+            with self.__lock:
+                self.__reserved -= 1
+                self.published += 1
+                acked = self.__early_acks.pop(info.mid, None)
+                if acked is None:
+                    self.__in_flight[info.mid] = sent
+                else:
+                    self.ack_latency.record(acked - sent)
+
+    def __next_message(self) -> _QueuedMessage | None:
+        now = time.monotonic()
+        with self.__lock:
+            # forget messages paho never acknowledged, so the window can't stall
+            for mid, sent in list(self.__in_flight.items()):
+                if now - sent > self.ttl * 2:
+                    self.__in_flight.pop(mid)
+            for mid, acked in list(self.__early_acks.items()):
+                if now - acked > self.ttl:
+                    self.__early_acks.pop(mid)
+            if len(self.__in_flight) + self.__reserved >= self.in_flight_window:
+                return None
+            while self.__queue:
+                message = self.__queue.popleft()
+                if now - message.enqueued <= message.ttl:
+                    self.__reserved += 1
+                    return message
+                self.expired += 1
+                _LOGGER.debug("Dropping expired message for %s", message.topic)
+            return None
+
+    def as_dict(self) -> dict[str, Any]:
+        with self.__lock:
+            return {
+                "queue_depth": len(self.__queue),
+                "in_flight": len(self.__in_flight),
+                "published": self.published,
+                "expired": self.expired,
+                "overflowed": self.overflowed,
+                "ack_latency": self.ack_latency.as_dict(),
+            }
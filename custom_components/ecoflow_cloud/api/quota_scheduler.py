@@ -0,0 +1,101 @@
+import asyncio
+import collections
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from ..devices.command_tracker import LatencyHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MIN_INTERVAL_SEC = 1.0
+DEFAULT_JITTER_SEC = 1.0
+
+
+class QuotaScheduler:
+    """
+    Runs the quota refreshes of one API client, one at a time.
+
+    Requests for a device whose refresh is already queued or running are
+    dropped (sub devices answered by their parent's quota share one key), and
+    refreshes start at least `min_interval` plus a random `jitter` seconds
+    apart. So when many status sensors notice an outage at once, the
+    refreshes are spread out instead of hitting the API all together.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        refresh: Callable[[str], Awaitable[None]],
+        key: Callable[[str], str],
+        min_interval: float = DEFAULT_MIN_INTERVAL_SEC,
+        jitter: float = DEFAULT_JITTER_SEC,
+    ):
+        self.__hass = hass
+        self.__refresh = refresh
+        self.__key = key
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self.__queue = collections.deque[tuple[str, float]]()
+        # keys queued or running
+        self.__pending: set[str] = set()
+        self.__task: asyncio.Task | None = None
+        self.__last_start = 0.0
+
+        # request until the refresh starts, the private API's refresh only
+        # publishes a get message, so its completion isn't seen here
+        self.queue_latency = LatencyHistogram()
+        self.requested = 0
+        self.deduplicated = 0
+        self.failed = 0
+
+    @callback
+    def request(self, sn: str) -> bool:
+        """Queue a refresh of `sn`, False if one is already queued or running."""
+        self.requested += 1
+        key = self.__key(sn)
+        if key in self.__pending:
+            self.deduplicated += 1
+            return False
+        self.__pending.add(key)
+        self.__queue.append((sn, time.monotonic()))
+        if self.__task is None or self.__task.done():
+            self.__task = self.__hass.async_create_background_task(
+                self.__run(), "ecoflow_cloud quota refresh"
+            )
+        return True
+
+    async def __run(self):
+        while self.__queue:
+            sn, requested = self.__queue.popleft()
+            delay = self.__last_start + self.min_interval - time.monotonic()
+            await asyncio.sleep(max(delay, 0) + random.uniform(0, self.jitter))
+            self.__last_start = time.monotonic()
+            self.queue_latency.record(self.__last_start - requested)
+            try:
+                await self.__refresh(sn)
+            except Exception as error:
+                self.failed += 1
+                _LOGGER.error("Error refreshing quota of %s: %s", sn, error)
+            finally:
+                self.__pending.discard(self.__key(sn))
+
+    @callback
+    def stop(self):
+        self.__queue.clear()
+        self.__pending.clear()
+        if self.__task is not None:
+            self.__task.cancel()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "queue_depth": len(self.__queue),
+            "requested": self.requested,
+            "deduplicated": self.deduplicated,
+            "failed": self.failed,
+            "queue_latency": self.queue_latency.as_dict(),
+        }
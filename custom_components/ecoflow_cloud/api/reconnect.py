@@ -0,0 +1,121 @@
+import asyncio
+import collections
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ReconnectSupervisor:
+    """
+    Runs MQTT (re)connects as a background task on the event loop.
+
+    Only one reconnect runs at a time and requests within `min_interval`
+    seconds of the last successful one are ignored, so several devices
+    noticing the same outage trigger a single reconnect. A lost connection
+    is always reconnected. Failed attempts, including connections the broker
+    refuses, are retried with exponential backoff and full jitter until the
+    broker accepts a connection again.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        name: str,
+        reconnect: Callable[[], Awaitable[None]],
+        base_delay: float = 1.0,
+        max_delay: float = 120.0,
+        min_interval: float = 30.0,
+    ):
+        self.name = name
+        self.__hass = hass
+        self.__reconnect = reconnect
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_interval = min_interval
+
+        self.__task: asyncio.Task | None = None
+        self.__stopped = False
+        self.__attempt = 0
+        self.__last_success = 0.0
+        self.__disconnected_at: float | None = None
+
+        self.reconnects = 0
+        self.failures = 0
+        self.disconnects = 0
+        self.downtimes = collections.deque[float](maxlen=20)
+
+    @callback
+    def request(self, lost: bool = False) -> bool:
+        if self.__stopped:
+            return False
+        if self.__task is not None and not self.__task.done():
+            return False
+        if not lost and time.monotonic() - self.__last_success < self.min_interval:
+            return False
+        self.__task = self.__hass.async_create_background_task(
+            self.__run(), f"{self.name} reconnect"
+        )
+        return True
+
+    def __delay(self) -> float:
+        if self.__attempt == 0:
+            return 0
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (self.__attempt - 1))
+        )
+
+    async def __run(self):
+        # attempts since the last accepted connection back off, even across requests
+        delay = self.__delay()
+        while not self.__stopped:
+            if delay:
+                await asyncio.sleep(delay)
+            self.__attempt += 1
+            try:
+                _LOGGER.info("Connecting to MQTT Broker %s", self.name)
+                await self.__reconnect()
+                self.reconnects += 1
+                self.__last_success = time.monotonic()
+                return
+            except Exception as error:
+                self.failures += 1
+                delay = self.__delay()
+                _LOGGER.error(
+                    "Connect to %s failed (%s), retrying in %.1f sec",
+                    self.name,
+                    error,
+                    delay,
+                )
+
+    @callback
+    def disconnected(self):
+        if self.__disconnected_at is None:
+            self.__disconnected_at = time.monotonic()
+            self.disconnects += 1
+
+    @callback
+    def connected(self):
+        self.__attempt = 0
+        if self.__disconnected_at is not None:
+            self.downtimes.append(time.monotonic() - self.__disconnected_at)
+            self.__disconnected_at = None
+
+    @callback
+    def stop(self):
+        self.__stopped = True
+        if self.__task is not None:
+            self.__task.cancel()
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "reconnects": self.reconnects,
+            "failures": self.failures,
+            "disconnects": self.disconnects,
+            "downtimes_sec": [round(d, 1) for d in self.downtimes],
+        }
@@ -0,0 +1,34 @@
+import time
+from collections.abc import Iterable
+from typing import Any
+
+
+class StartupMetrics:
+    """
+    Seconds from the start of the config entry setup to the first MQTT
+    connect, the first data frame and the first entity state written from it.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.connected: float | None = None
+
+    def mark_connected(self):
+        if self.connected is None:
+            self.connected = time.monotonic()
+
+    def __since_start(self, times: Iterable[float | None]) -> float | None:
+        known = [t for t in times if t is not None]
+        return round(min(known) - self.started, 3) if known else None
+
+    def as_dict(self, devices: Iterable[Any]) -> dict[str, Any]:
+        devices = list(devices)
+        return {
+            "connected_sec": self.__since_start([self.connected]),
+            "first_frame_sec": self.__since_start(
+                device.data.first_frame_time for device in devices
+            ),
+            "first_state_sec": self.__since_start(
+                device.coordinator.first_state_time for device in devices
+            ),
+        }
@@ -0,0 +1,68 @@
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# device serials replaced by "+" when at least this many devices share a topic pattern
+MIN_WILDCARD_DEVICES = 2
+
+
+class SubscriptionPlanner:
+    """
+    Topics the MQTT session of one config entry subscribes to.
+
+    The set/get topics only echo our own commands back, so they are
+    subscribed only for devices in diagnostic mode. The low rate reply and
+    status topics of several devices are collapsed into one wildcard on the
+    device serial, but only when the topic is scoped to the account (so the
+    broker ACL can grant it). Data topics stay per device, a wildcard there
+    would pull the telemetry of devices not set up in HA. If the broker
+    refuses a wildcard, explicit topics are used from then on.
+    """
+
+    def __init__(self, account: str | None):
+        self.account = account
+        self.wildcards = account is not None
+
+    def plan(self, devices: Iterable[Any]) -> list[str]:
+        topics = set[str]()
+        patterns: dict[str, set[str]] = {}
+        for device in devices:
+            info = device.device_info
+            topics.add(info.data_topic)
+            if device.device_data.options.diagnostic_mode:
+                topics.update(t for t in (info.set_topic, info.get_topic) if t)
+            for topic in (info.set_reply_topic, info.get_reply_topic, info.status_topic):
+                if not topic:
+                    continue
+                pattern = self.__wildcard(topic, info.sn)
+                if pattern is None:
+                    topics.add(topic)
+                else:
+                    patterns.setdefault(pattern, set()).add(topic)
+
+        for pattern, pattern_topics in patterns.items():
+            if len(pattern_topics) >= MIN_WILDCARD_DEVICES:
+                topics.add(pattern)
+            else:
+                topics.update(pattern_topics)
+        return sorted(topics)
+
+    def refused(self, topics: Iterable[str]) -> bool:
+        """Stop using wildcards if one was refused, True if the plan changes."""
+        if self.wildcards and any("+" in topic for topic in topics):
+            _LOGGER.warning(
+                "MQTT broker refused wildcard subscriptions, subscribing per device"
+            )
+            self.wildcards = False
+            return True
+        return False
+
+    def __wildcard(self, topic: str, sn: str) -> str | None:
+        if not self.wildcards:
+            return None
+        levels = topic.split("/")
+        if self.account not in levels or sn not in levels:
+            return None
+        return "/".join("+" if level == sn else level for level in levels)
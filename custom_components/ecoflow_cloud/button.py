@@ -2,6 +2,7 @@ import logging
 from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
@@ -18,6 +19,7 @@ async def async_setup_entry(
     client: EcoflowApiClient = hass.data[ECOFLOW_DOMAIN][entry.entry_id]
     for sn, device in client.devices.items():
         async_add_entities(device.buttons(client))
+        device.discovery.platform_ready(Platform.BUTTON, async_add_entities)
 
 
 class EnabledButtonEntity(BaseButtonEntity):
@@ -30,11 +30,26 @@ from . import (
     CONF_SELECT_DEVICE_KEY,
     CONF_USERNAME,
     CONFIG_VERSION,
+    DEFAULT_CONNECT_TIMEOUT_SEC,
     DEFAULT_REFRESH_PERIOD_SEC,
     ECOFLOW_DOMAIN,
     OPTS_DIAGNOSTIC_MODE,
+    OPTS_DIAGNOSTIC_SENSORS,
     OPTS_POWER_STEP,
     OPTS_REFRESH_PERIOD_SEC,
+    OPTS_COMPACT_PARAMS,
+    OPTS_CONNECT_TIMEOUT,
+    OPTS_CURRENT_DEADBAND,
+    OPTS_MAX_REFRESH_PERIOD_SEC,
+    OPTS_MAX_STALENESS,
+    OPTS_MIN_REFRESH_PERIOD_SEC,
+    OPTS_MIN_WRITE_INTERVAL,
+    OPTS_POWER_DEADBAND,
+    OPTS_RELATIVE_DEADBAND,
+    OPTS_TRACE_COMMANDS,
+    OPTS_TRACE_MODE,
+    OPTS_TRACE_SAMPLE,
+    OPTS_VOLTAGE_DEADBAND,
     DeviceData,
     DeviceOptions,
     extract_devices,
@@ -516,9 +531,63 @@ class EcoflowOptionsFlow(OptionsFlowWithConfigEntry):
                             OPTS_REFRESH_PERIOD_SEC,
                             default=device_options.refresh_period,
                         ): int,
+                        vol.Required(
+                            OPTS_MIN_REFRESH_PERIOD_SEC,
+                            default=device_options.min_refresh_period
+                            or device_options.refresh_period,
+                        ): vol.All(int, vol.Range(min=1)),
+                        vol.Required(
+                            OPTS_MAX_REFRESH_PERIOD_SEC,
+                            default=device_options.max_refresh_period
+                            or device_options.refresh_period,
+                        ): vol.All(int, vol.Range(min=1)),
                         vol.Required(
                             OPTS_DIAGNOSTIC_MODE, default=device_options.diagnostic_mode
                         ): bool,
+                        vol.Required(
+                            OPTS_DIAGNOSTIC_SENSORS,
+                            default=device_options.diagnostic_sensors,
+                        ): bool,
+                        vol.Required(
+                            OPTS_TRACE_MODE, default=device_options.trace_mode
+                        ): bool,
+                        vol.Required(
+                            OPTS_TRACE_SAMPLE, default=device_options.trace_sample
+                        ): vol.All(int, vol.Range(min=1)),
+                        vol.Optional(
+                            OPTS_TRACE_COMMANDS, default=device_options.trace_commands
+                        ): str,
+                        vol.Required(
+                            OPTS_COMPACT_PARAMS, default=device_options.compact_params
+                        ): bool,
+                        vol.Required(
+                            OPTS_POWER_DEADBAND, default=device_options.power_deadband
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                        vol.Required(
+                            OPTS_VOLTAGE_DEADBAND,
+                            default=device_options.voltage_deadband,
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                        vol.Required(
+                            OPTS_CURRENT_DEADBAND,
+                            default=device_options.current_deadband,
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                        vol.Required(
+                            OPTS_RELATIVE_DEADBAND,
+                            default=device_options.relative_deadband,
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+                        vol.Required(
+                            OPTS_MIN_WRITE_INTERVAL,
+                            default=device_options.min_write_interval,
+                        ): vol.All(int, vol.Range(min=0)),
+                        vol.Required(
+                            OPTS_MAX_STALENESS, default=device_options.max_staleness
+                        ): vol.All(int, vol.Range(min=1)),
+                        vol.Required(
+                            OPTS_CONNECT_TIMEOUT,
+                            default=self.config_entry.options.get(
+                                OPTS_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT_SEC
+                            ),
+                        ): vol.All(int, vol.Range(min=5)),
                     }
                 ),
             )
@@ -527,7 +596,21 @@ class EcoflowOptionsFlow(OptionsFlowWithConfigEntry):
         new_options[CONF_DEVICE_LIST][self.selected_device.sn] = {
             OPTS_POWER_STEP: user_input[OPTS_POWER_STEP],
             OPTS_REFRESH_PERIOD_SEC: user_input[OPTS_REFRESH_PERIOD_SEC],
+            OPTS_MIN_REFRESH_PERIOD_SEC: user_input[OPTS_MIN_REFRESH_PERIOD_SEC],
+            OPTS_MAX_REFRESH_PERIOD_SEC: user_input[OPTS_MAX_REFRESH_PERIOD_SEC],
             OPTS_DIAGNOSTIC_MODE: user_input[OPTS_DIAGNOSTIC_MODE],
+            OPTS_DIAGNOSTIC_SENSORS: user_input[OPTS_DIAGNOSTIC_SENSORS],
+            OPTS_TRACE_MODE: user_input[OPTS_TRACE_MODE],
+            OPTS_TRACE_SAMPLE: user_input[OPTS_TRACE_SAMPLE],
+            OPTS_TRACE_COMMANDS: user_input.get(OPTS_TRACE_COMMANDS, ""),
+            OPTS_COMPACT_PARAMS: user_input[OPTS_COMPACT_PARAMS],
+            OPTS_POWER_DEADBAND: user_input[OPTS_POWER_DEADBAND],
+            OPTS_VOLTAGE_DEADBAND: user_input[OPTS_VOLTAGE_DEADBAND],
+            OPTS_CURRENT_DEADBAND: user_input[OPTS_CURRENT_DEADBAND],
+            OPTS_RELATIVE_DEADBAND: user_input[OPTS_RELATIVE_DEADBAND],
+            OPTS_MIN_WRITE_INTERVAL: user_input[OPTS_MIN_WRITE_INTERVAL],
+            OPTS_MAX_STALENESS: user_input[OPTS_MAX_STALENESS],
         }
+        new_options[OPTS_CONNECT_TIMEOUT] = user_input[OPTS_CONNECT_TIMEOUT]
 
         return self.async_create_entry(title="", data=new_options)
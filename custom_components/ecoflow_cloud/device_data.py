@@ -8,6 +8,21 @@ class DeviceOptions:
     refresh_period: int
     power_step: int
     diagnostic_mode: bool
+    trace_mode: bool = False
+    trace_sample: int = 1
+    trace_commands: str = ""
+    compact_params: bool = False
+    power_deadband: float = 0
+    voltage_deadband: float = 0
+    current_deadband: float = 0
+    relative_deadband: float = 0
+    min_write_interval: int = 0
+    max_staleness: int = 300
+    # 0: same as refresh_period
+    min_refresh_period: int = 0
+    max_refresh_period: int = 0
+    # disabled diagnostic sensors for keys no entity reads
+    diagnostic_sensors: bool = False
 
 
 @dataclasses.dataclass
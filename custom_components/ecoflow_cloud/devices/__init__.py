@@ -2,8 +2,9 @@ import dataclasses
 import datetime
 import json
 import logging
+import time
 from abc import ABC, abstractmethod
-from collections.abc import Sequence
+from collections.abc import Callable, Mapping, Sequence
 from typing import Any, cast
 
 from homeassistant.components.button import ButtonEntity
@@ -11,17 +12,29 @@ from homeassistant.components.number import NumberEntity
 from homeassistant.components.select import SelectEntity
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util import dt
 
 from ..api import EcoflowApiClient
 from ..api.message import JSONDict, JSONMessage, Message
 from ..device_data import DeviceData
+from .adaptive_interval import AdaptiveInterval
+from .command_queue import CommandQueue
+from .command_tracker import CommandTracker
+from .compact_params import CompactParams, ParamsSchema
 from .data_holder import EcoflowDataHolder
+from .entity_discovery import EntityDiscovery, EntityFactory
+from .frame_cache import FrameCache
+from .tracer import DeviceTracer, command_key
+from .unmapped_keys import UnmappedKeys
+from .wanted_fields import WantedFields
 
 _LOGGER = logging.getLogger(__name__)
 
+_MISSING = object()
+
 
 @dataclasses.dataclass
 class EcoflowDeviceInfo:
@@ -55,6 +68,11 @@ class EcoflowDeviceInfo:
 class EcoflowBroadcastDataHolder:
     data_holder: EcoflowDataHolder
     changed: bool
+    # new params from the device, a status message alone doesn't count
+    params_changed: bool
+    # params snapshot pinned for the whole coordinator tick
+    params: Mapping[str, Any]
+    params_version: int
 
 
 class NoQuotaMessageError(Exception):
@@ -62,25 +80,189 @@ class NoQuotaMessageError(Exception):
 
 
 class EcoflowDeviceUpdateCoordinator(DataUpdateCoordinator[EcoflowBroadcastDataHolder]):
-    def __init__(self, hass, holder: EcoflowDataHolder, refresh_period: int) -> None:
+    def __init__(
+        self,
+        hass,
+        holder: EcoflowDataHolder,
+        refresh_period: int,
+        min_refresh_period: int = 0,
+        max_refresh_period: int = 0,
+    ) -> None:
         """Initialize the coordinator."""
+        base = max(refresh_period, 5)
         super().__init__(
             hass,
             _LOGGER,
             name="Ecoflow update coordinator",
             always_update=True,
-            update_interval=datetime.timedelta(seconds=max(refresh_period, 5)),
+            update_interval=datetime.timedelta(seconds=base),
         )
         self.holder = holder
+        self.base_interval = datetime.timedelta(seconds=base)
+        # bounds of 0 keep the configured period, equal bounds disable adapting
+        self.adaptive = AdaptiveInterval(
+            base, min_refresh_period or base, max_refresh_period or base
+        )
+        # base intervals elapsed since the previous tick, fractional for
+        # ticks shorter than the base interval
+        self.tick_weight = 1.0
+        self.__last_tick = time.monotonic()
+        self.__seen_version = holder.params_version
+        self.__wake_pending = False
+        if self.adaptive.enabled:
+            holder.add_params_listener(self.__on_frame)
         self.__last_broadcast = dt.utcnow().replace(
             year=2000, month=1, day=1, hour=0, minute=0, second=0
         )
+        self.__last_params_time = self.__last_broadcast
+        self.__pending_writes: dict[Entity, None] = {}
+        self.__batching = False
+        # offline: only the status listeners run, data entities are unavailable
+        self.offline = False
+        self.__data_entities: dict[Entity, None] = {}
+        self.__status_listeners: list[Callable[[], None]] = []
+        self.__key_listeners: dict[str, list[Callable[[Any], None]]] = {}
+        self.__key_values: dict[str, Any] = {}
+        # monotonic time of the first state write after live data arrived
+        self.first_state_time: float | None = None
+
+    @callback
+    def async_update_listeners(self) -> None:
+        if self.offline and self.data is not None and self.data.params_changed:
+            # first new params frame, back to full evaluation
+            self.async_set_offline(False)
+        # entities only mark themselves dirty while listeners run, states are written once at the end
+        self.__batching = True
+        try:
+            if self.offline:
+                for update in list(self.__status_listeners):
+                    update()
+            else:
+                super().async_update_listeners()
+                self.__update_key_listeners()
+        finally:
+            self.__batching = False
+        self.async_write_states()
+
+    @callback
+    def async_add_data_entity(self, entity: Entity) -> Callable[[], None]:
+        """Entity that is unavailable and not evaluated while the device is offline."""
+        self.__data_entities[entity] = None
+
+        def remove():
+            self.__data_entities.pop(entity, None)
+
+        return remove
+
+    @callback
+    def async_add_status_listener(self, update: Callable[[], None]) -> Callable[[], None]:
+        """Listener that keeps running while the device is offline."""
+        self.__status_listeners.append(update)
+
+        def remove():
+            if update in self.__status_listeners:
+                self.__status_listeners.remove(update)
+
+        return remove
+
+    @callback
+    def async_add_key_listener(
+        self, key: str, update: Callable[[Any], None]
+    ) -> Callable[[], None]:
+        """Listener called with the value of one flat params key, only when it changed."""
+        self.__key_listeners.setdefault(key, []).append(update)
+
+        def remove():
+            listeners = self.__key_listeners.get(key, [])
+            if update in listeners:
+                listeners.remove(update)
+            if not listeners:
+                self.__key_listeners.pop(key, None)
+                self.__key_values.pop(key, None)
+
+        return remove
+
+    def __update_key_listeners(self):
+        if not self.__key_listeners or self.data is None or not self.data.changed:
+            return
+        params = self.data.params
+        values = self.__key_values
+        for key, listeners in list(self.__key_listeners.items()):
+            value = params.get(key, _MISSING)
+            if value is _MISSING or value == values.get(key, _MISSING):
+                continue
+            values[key] = value
+            for update in list(listeners):
+                update(value)
+
+    @callback
+    def async_set_offline(self, offline: bool):
+        if offline == self.offline:
+            return
+        _LOGGER.debug(
+            "%s: %s entity evaluation",
+            self.holder.module_sn or self.name,
+            "suspending" if offline else "resuming",
+        )
+        self.offline = offline
+        # availability changed for all of them, written in one batch
+        for entity in self.__data_entities:
+            self.async_schedule_state_write(entity)
+
+    @callback
+    def async_schedule_state_write(self, entity: Entity):
+        self.__pending_writes[entity] = None
+        if not self.__batching and len(self.__pending_writes) == 1:
+            # changed outside of a coordinator update
+            self.hass.loop.call_soon(self.async_write_states)
+
+    @callback
+    def async_write_states(self):
+        pending, self.__pending_writes = self.__pending_writes, {}
+        if (
+            pending
+            and self.first_state_time is None
+            and self.holder.first_frame_time is not None
+        ):
+            self.first_state_time = time.monotonic()
+        for entity in pending:
+            if entity.hass is None:
+                continue
+            try:
+                entity.async_write_ha_state()
+            except Exception as error:
+                _LOGGER.error("Error writing state of %s: %s", entity.entity_id, error)
+
+    @callback
+    def __on_frame(self, params: Mapping[str, Any]):
+        version = self.holder.params_version
+        changed, self.__seen_version = version != self.__seen_version, version
+        if self.adaptive.frame(changed) and not self.__wake_pending:
+            # values started changing while backed off, don't wait for the long tick
+            self.__wake_pending = True
+            self.hass.async_create_background_task(
+                self.async_refresh(), "ecoflow_cloud wake coordinator"
+            )
 
     async def _async_update_data(self) -> EcoflowBroadcastDataHolder:
-        received_time = self.holder.last_received_time()
+        self.__wake_pending = False
+        received_time = self.holder.last_changed_time()
         changed = self.__last_broadcast < received_time
         self.__last_broadcast = received_time
-        return EcoflowBroadcastDataHolder(self.holder, changed)
+        params_changed = self.__last_params_time < self.holder.params_time
+        self.__last_params_time = self.holder.params_time
+
+        now = time.monotonic()
+        self.tick_weight = (now - self.__last_tick) / self.base_interval.total_seconds()
+        self.__last_tick = now
+        if self.adaptive.enabled:
+            self.update_interval = datetime.timedelta(
+                seconds=self.adaptive.tick(changed)
+            )
+        version, params = self.holder.snapshot()
+        return EcoflowBroadcastDataHolder(
+            self.holder, changed, params_changed, params, version
+        )
 
 
 class BaseDevice(ABC):
@@ -88,25 +270,73 @@ class BaseDevice(ABC):
         super().__init__()
         self.coordinator = None
         self.data = None
+        self.commands = None
+        self.command_tracker = None
+        self.discovery = None
+        self.unmapped_keys = None
+        # params keys of all entities built for the device, enabled or not
+        self.mapped_keys = set[str]()
         self.device_info: EcoflowDeviceInfo = device_info
         self.power_step: int = device_data.options.power_step
         self.device_data: DeviceData = device_data
+        self.tracer = DeviceTracer(
+            device_data.sn,
+            device_data.options.trace_mode,
+            device_data.options.trace_sample,
+            device_data.options.trace_commands,
+        )
+        self.frame_cache = FrameCache(
+            (device_info.data_topic, device_info.status_topic)
+        )
+        # frames decoded for the previous set of entities must not be reused
+        # diagnostic sensors are discovered from the fields no entity reads
+        self.wanted = WantedFields(
+            not device_data.options.diagnostic_mode
+            and not device_data.options.diagnostic_sensors,
+            self.frame_cache.clear,
+        )
 
-    def configure(self, hass: HomeAssistant):
+    def configure(
+        self,
+        hass: HomeAssistant,
+        restored: tuple[Mapping[str, Any], datetime.datetime] | None = None,
+    ):
+        params = None
+        if self.device_data.options.compact_params:
+            params = CompactParams(ParamsSchema.for_device_class(type(self).__name__))
         if self.device_data.parent is not None:
             self.data = EcoflowDataHolder(
                 self.private_api_extract_quota_message,
                 self.device_data.sn,
                 self.device_data.options.diagnostic_mode,
+                params,
             )
         else:
             self.data = EcoflowDataHolder(
                 self.private_api_extract_quota_message,
                 None,
                 self.device_data.options.diagnostic_mode,
+                params,
             )
         self.coordinator = EcoflowDeviceUpdateCoordinator(
-            hass, self.data, self.device_data.options.refresh_period
+            hass,
+            self.data,
+            self.device_data.options.refresh_period,
+            self.device_data.options.min_refresh_period,
+            self.device_data.options.max_refresh_period,
+        )
+        if restored is not None:
+            self.data.restore(*restored)
+        self.commands = CommandQueue(hass)
+        self.command_tracker = CommandTracker(hass, self.data)
+        self.data.set_reply_listener = self.command_tracker.reply
+        self.discovery = EntityDiscovery(self.data)
+        self.unmapped_keys = UnmappedKeys(
+            hass,
+            self.device_data.sn,
+            self.data,
+            self.mapped_keys,
+            self.device_data.options.diagnostic_sensors,
         )
 
     @staticmethod
@@ -161,28 +391,82 @@ class BaseDevice(ABC):
     def buttons(self, client: EcoflowApiClient) -> Sequence[ButtonEntity]:
         return []
 
+    def entity_factories(self, client: EcoflowApiClient) -> Sequence[EntityFactory]:
+        """Entities that can only be built from the device's data, added once it arrives."""
+        return []
+
+    def skip_repeated_frame(self, raw_data: bytes, data_type: str) -> bool:
+        """True (and the frame counted as seen) if a data frame would merge nothing."""
+        if data_type != self.device_info.data_topic or not self.frame_cache.repeated(
+            data_type, raw_data, self.data.params_version
+        ):
+            return False
+        self.data.repeated_frame()
+        return True
+
+    def frame_merged(self, raw_data: bytes, data_type: str, data_frames: int):
+        # only frames that carried params for this device (not another module's)
+        if data_type == self.device_info.data_topic and self.data.data_frames != data_frames:
+            self.frame_cache.merged(data_type, raw_data, self.data.params_version)
+
     def update_data(self, raw_data: bytes, data_type: str) -> bool:
+        if self.skip_repeated_frame(raw_data, data_type):
+            return True
+        data_frames = self.data.data_frames
+        raw = self.prepare_data(raw_data, data_type)
+        if raw is None:
+            return False
+        self.apply_data(raw, data_type)
+        self.frame_merged(raw_data, data_type, data_frames)
+        if self.tracer.enabled:
+            self.tracer.record(command_key(raw), raw_data, raw, data_type)
+        return True
+
+    def prepare_data(self, raw_data: bytes, data_type: str) -> dict[str, Any] | None:
+        if data_type == self.device_info.data_topic:
+            return self._decode_cached(
+                raw_data, data_type, self._prepare_data_data_topic
+            )
+        elif data_type == self.device_info.set_topic:
+            return self._prepare_data_set_topic(raw_data)
+        elif data_type == self.device_info.set_reply_topic:
+            return self._prepare_data_set_reply_topic(raw_data)
+        elif data_type == self.device_info.get_topic:
+            return self._prepare_data_get_topic(raw_data)
+        elif data_type == self.device_info.get_reply_topic:
+            return self._prepare_data_get_reply_topic(raw_data)
+        elif data_type == self.device_info.status_topic:
+            return self._decode_cached(
+                raw_data, data_type, self._prepare_data_status_topic
+            )
+        return None
+
+    def _decode_cached(
+        self,
+        raw_data: bytes,
+        data_type: str,
+        decode: Callable[[bytes], dict[str, Any]],
+    ) -> dict[str, Any]:
+        raw = self.frame_cache.get(data_type, raw_data)
+        if raw is None:
+            raw = decode(raw_data)
+            if raw:
+                self.frame_cache.put(data_type, raw_data, raw)
+        return raw
+
+    def apply_data(self, raw: dict[str, Any], data_type: str):
         if data_type == self.device_info.data_topic:
-            raw = self._prepare_data_data_topic(raw_data)
             self.data.update_data(raw)
         elif data_type == self.device_info.set_topic:
-            raw = self._prepare_data_set_topic(raw_data)
             self.data.add_set_message(raw)
         elif data_type == self.device_info.set_reply_topic:
-            raw = self._prepare_data_set_reply_topic(raw_data)
             self.data.add_set_reply_message(raw)
         elif data_type == self.device_info.get_topic:
-            raw = self._prepare_data_get_topic(raw_data)
             self.data.add_get_message(raw)
         elif data_type == self.device_info.get_reply_topic:
-            raw = self._prepare_data_get_reply_topic(raw_data)
             self.data.add_get_reply_message(raw)
         elif data_type == self.device_info.status_topic:
-            raw = self._prepare_data_status_topic(raw_data)
             self.data.update_status(raw)
-        else:
-            return False
-        return True
 
     def _prepare_data_data_topic(self, raw_data: bytes) -> dict[str, Any]:
         return self._prepare_data(raw_data)
@@ -220,6 +504,59 @@ class BaseDevice(ABC):
             return {}
 
 
+class SubDeviceRouter:
+    """
+    Dispatches frames of topics shared by a parent device and its sub devices.
+
+    A frame is decoded once by the first device and data frames are routed by
+    `moduleSn` to the matching sub device (plus the devices without module sn),
+    instead of every sibling decoding the same bytes and discarding the result.
+    That is only done when all devices are of one class that keeps the base
+    `update_data`, otherwise every device gets the frame through its own.
+    """
+
+    def __init__(self, devices: list[BaseDevice]):
+        self.decoder = devices[0]
+        self.devices = devices
+        self.shared_decode = (
+            len({type(d) for d in devices}) == 1
+            and type(self.decoder).update_data is BaseDevice.update_data
+        )
+        self.unfiltered = [d for d in devices if d.data.module_sn is None]
+        self.by_module_sn = {
+            d.data.module_sn: d for d in devices if d.data.module_sn is not None
+        }
+
+    def update_data(self, raw_data: bytes, data_type: str) -> bool:
+        if not self.shared_decode:
+            handled = False
+            for device in self.devices:
+                handled = device.update_data(raw_data, data_type) or handled
+            return handled
+
+        raw = self.decoder.prepare_data(raw_data, data_type)
+        if raw is None:
+            return False
+
+        if data_type == self.decoder.device_info.data_topic:
+            targets = list(self.unfiltered)
+            sub_device = self.by_module_sn.get(raw.get("moduleSn"))
+            if sub_device is not None:
+                targets.append(sub_device)
+        else:
+            targets = self.devices
+
+        for device in targets:
+            if device.skip_repeated_frame(raw_data, data_type):
+                continue
+            data_frames = device.data.data_frames
+            device.apply_data(raw, data_type)
+            device.frame_merged(raw_data, data_type, data_frames)
+            if device.tracer.enabled:
+                device.tracer.record(command_key(raw), raw_data, raw, data_type)
+        return True
+
+
 class DiagnosticDevice(BaseDevice):
     def sensors(self, client: EcoflowApiClient) -> Sequence[SensorEntity]:
         return []
@@ -0,0 +1,68 @@
+import time
+from typing import Any
+
+# weight of the newest inter-arrival time in the moving average
+_ALPHA = 0.3
+
+
+class AdaptiveInterval:
+    """
+    Coordinator tick interval learned from how often a device's values change.
+
+    The time between frames that changed a value is averaged (EWMA). While
+    values change the coordinator ticks at that rate, within
+    [min_interval, max_interval]. Every tick without a change doubles the
+    interval up to max_interval, so idle and offline devices are evaluated
+    rarely. A change arriving while backed off asks for an immediate tick.
+    """
+
+    def __init__(self, initial: float, min_interval: float, max_interval: float):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.interval = self.__clamp(initial)
+        self.arrival: float | None = None
+        self.__last_change: float | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_interval > self.min_interval
+
+    def __clamp(self, value: float) -> float:
+        return min(max(value, self.min_interval), self.max_interval)
+
+    def frame(self, changed: bool, now: float | None = None) -> bool:
+        """Record a data frame, True if the coordinator should tick now."""
+        if not changed:
+            return False
+        if now is None:
+            now = time.monotonic()
+        gap = now - self.__last_change if self.__last_change is not None else None
+        # longer gaps are idle periods, not the device's update rate
+        if gap is not None and gap <= self.max_interval:
+            if self.arrival is None:
+                self.arrival = gap
+            else:
+                self.arrival += _ALPHA * (gap - self.arrival)
+        self.__last_change = now
+        return self.enabled and self.interval > self.__target() * 2
+
+    def __target(self) -> float:
+        return self.__clamp(self.arrival if self.arrival is not None else self.min_interval)
+
+    def tick(self, changed: bool) -> float:
+        """Interval until the next tick, after a tick that did or didn't see changed data."""
+        if not self.enabled:
+            return self.interval
+        if changed:
+            self.interval = self.__target()
+        else:
+            self.interval = self.__clamp(self.interval * 2)
+        return self.interval
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "interval_sec": round(self.interval, 1),
+            "arrival_sec": round(self.arrival, 1) if self.arrival is not None else None,
+            "min_sec": self.min_interval,
+            "max_sec": self.max_interval,
+        }
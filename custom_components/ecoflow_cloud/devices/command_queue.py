@@ -0,0 +1,92 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class _PendingCommand:
+    send: Callable[[dict[str, Any]], None]
+    # values from before the first write of the burst, what a failure rolls back to
+    previous: dict[str, Any]
+    first_time: float
+    handle: asyncio.TimerHandle
+    coalesced: int = 0
+
+
+class CommandQueue:
+    """
+    Per device last-write-wins command queue.
+
+    Writes to the same key within `delay` seconds are coalesced and only the
+    last one is sent. `max_delay` bounds how long a continuous burst (e.g. a
+    slider being dragged) can hold back a publish. Callers apply the target
+    state themselves when submitting, only the publish waits here.
+    """
+
+    def __init__(self, hass: HomeAssistant, delay: float = 0.5, max_delay: float = 2.0):
+        self.__hass = hass
+        self.delay = delay
+        self.max_delay = max_delay
+        self.__pending: dict[str, _PendingCommand] = {}
+        self.submitted = 0
+        self.sent = 0
+
+    def submit(
+        self,
+        key: str,
+        send: Callable[[dict[str, Any]], None],
+        previous: dict[str, Any],
+    ):
+        # entities may call this from executor threads (sync select/switch handlers)
+        self.__hass.loop.call_soon_threadsafe(self.__submit, key, send, previous)
+
+    @callback
+    def __submit(
+        self,
+        key: str,
+        send: Callable[[dict[str, Any]], None],
+        previous: dict[str, Any],
+    ):
+        self.submitted += 1
+        now = time.monotonic()
+        pending = self.__pending.get(key)
+        if pending is not None:
+            pending.handle.cancel()
+            first_time = pending.first_time
+            previous = pending.previous
+            coalesced = pending.coalesced + 1
+        else:
+            first_time = now
+            coalesced = 0
+
+        delay = min(self.delay, max(first_time + self.max_delay - now, 0))
+        handle = self.__hass.loop.call_later(delay, self.__flush, key)
+        self.__pending[key] = _PendingCommand(
+            send, previous, first_time, handle, coalesced
+        )
+
+    @callback
+    def __flush(self, key: str):
+        pending = self.__pending.pop(key, None)
+        if pending is None:
+            return
+        if pending.coalesced:
+            _LOGGER.debug("Coalesced %d writes for %s", pending.coalesced, key)
+        self.sent += 1
+        try:
+            pending.send(pending.previous)
+        except Exception as error:
+            _LOGGER.error("Error sending command for %s: %s", key, error)
+
+    @callback
+    def flush_all(self):
+        for key, pending in list(self.__pending.items()):
+            pending.handle.cancel()
+            self.__flush(key)
@@ -0,0 +1,168 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .data_holder import EcoflowDataHolder
+
+_LOGGER = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_SEC = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS_SEC):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> dict[str, Any]:
+        labels = [f"<={b}s" for b in self.buckets] + [f">{self.buckets[-1]}s"]
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else None,
+            "max": round(self.max, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+@dataclasses.dataclass
+class _OutstandingCommand:
+    target: dict[str, Any]
+    previous: dict[str, Any]
+    sent_time: float
+    # holder.data_frames when the command was sent
+    data_frames: int
+    handle: asyncio.TimerHandle | None = None
+
+
+class CommandTracker:
+    """
+    Matches published set commands with their set_reply by message id/seq.
+
+    Optimistic target state is rolled back when a failure reply arrives, or
+    when no reply arrives within `timeout` seconds and the device sent no
+    data since (the reply may just be lost, its data then shows the real
+    state). Keys whose value no longer is the target are left alone.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, holder: EcoflowDataHolder, timeout: float = 15.0
+    ):
+        self.__hass = hass
+        self.__holder = holder
+        self.timeout = timeout
+        self.__outstanding: dict[str, _OutstandingCommand] = {}
+        self.latency = LatencyHistogram()
+        self.acked = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rolled_back = 0
+
+    def track(
+        self, message_id: str | None, target: dict[str, Any], previous: dict[str, Any]
+    ):
+        if message_id is None:
+            return
+        command = _OutstandingCommand(
+            target, previous, time.monotonic(), self.__holder.data_frames
+        )
+        # sync entity setters send from executor threads
+        self.__hass.loop.call_soon_threadsafe(self.__track, message_id, command)
+
+    @callback
+    def reply(self, raw: dict[str, Any]):
+        message_id = raw.get("id", raw.get("seq"))
+        if message_id is None:
+            return
+        self.__reply(str(message_id), self._is_failure(raw), time.monotonic())
+
+    @staticmethod
+    def _is_failure(raw: dict[str, Any]) -> bool:
+        code = raw.get("code")
+        if code not in (None, "") and str(code) != "0":
+            return True
+        data = raw.get("data")
+        for result in (raw, data if isinstance(data, dict) else {}):
+            # "ack" is 0 on some devices and 1 on others for accepted commands
+            # (see the diag samples), only explicit results tell a rejection
+            if result.get("configOk") is False:
+                return True
+            value = result.get("result")
+            if value is not None and str(value) != "0":
+                return True
+        return False
+
+    @property
+    def outstanding(self) -> int:
+        return len(self.__outstanding)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "outstanding": self.outstanding,
+            "acked": self.acked,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rolled_back": self.rolled_back,
+            "latency": self.latency.as_dict(),
+        }
+
+    @callback
+    def __track(self, message_id: str, command: _OutstandingCommand):
+        command.handle = self.__hass.loop.call_later(
+            self.timeout, self.__expire, message_id
+        )
+        self.__outstanding[message_id] = command
+
+    @callback
+    def __reply(self, message_id: str, failed: bool, received: float):
+        command = self.__outstanding.pop(message_id, None)
+        if command is None:
+            return
+        command.handle.cancel()
+        self.latency.record(received - command.sent_time)
+        if failed:
+            self.failed += 1
+            _LOGGER.warning("Command %s rejected by device", message_id)
+            self.__rollback(command)
+        else:
+            self.acked += 1
+
+    @callback
+    def __expire(self, message_id: str):
+        command = self.__outstanding.pop(message_id, None)
+        if command is None:
+            return
+        self.timed_out += 1
+        _LOGGER.warning(
+            "No reply for command %s within %s sec", message_id, self.timeout
+        )
+        if self.__holder.data_frames == command.data_frames:
+            self.__rollback(command)
+
+    def __rollback(self, command: _OutstandingCommand):
+        current = self.__holder.target_state_values(command.target.keys())
+        restore = {
+            key: value
+            for key, value in command.previous.items()
+            if current.get(key) == command.target[key]
+        }
+        if restore:
+            self.rolled_back += 1
+            self.__holder.update_to_target_state(restore)
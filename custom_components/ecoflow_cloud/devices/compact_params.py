@@ -0,0 +1,158 @@
+import array
+import threading
+from collections.abc import Iterator, MutableMapping
+from typing import Any
+
+_EMPTY = 0
+_INT = 1
+_BOOL = 2
+_FLOAT = 3
+_OBJECT = 4
+
+# ints in this range survive the round trip through a double unchanged
+_EXACT_INT = 2**53
+
+
+class ParamsSchema:
+    """
+    Append only key -> slot table, shared by all devices of one device class.
+    """
+
+    __schemas: dict[str, "ParamsSchema"] = {}
+    __schemas_lock = threading.Lock()
+
+    def __init__(self):
+        self.keys: list[str] = []
+        self.slots: dict[str, int] = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def for_device_class(cls, name: str) -> "ParamsSchema":
+        with cls.__schemas_lock:
+            schema = cls.__schemas.get(name)
+            if schema is None:
+                schema = cls.__schemas[name] = ParamsSchema()
+            return schema
+
+    def slot(self, key: str) -> int:
+        slot = self.slots.get(key)
+        if slot is None:
+            with self.__lock:
+                slot = self.slots.get(key)
+                if slot is None:
+                    slot = len(self.keys)
+                    self.keys.append(key)
+                    self.slots[key] = slot
+        return slot
+
+
+def _kind(value: Any) -> int:
+    value_type = type(value)
+    if value_type is float:
+        return _FLOAT
+    if value_type is int and -_EXACT_INT <= value <= _EXACT_INT:
+        return _INT
+    if value_type is bool:
+        return _BOOL
+    return _OBJECT
+
+
+class CompactParams(MutableMapping[str, Any]):
+    """
+    Params mapping storing numbers in a typed array indexed by schema slot.
+
+    Ints, floats and bools cost 9 bytes per key (value + kind) instead of a
+    dict entry plus a boxed number; strings, lists and dicts fall back to a
+    per-slot object dict. `copy()` is a couple of memcpy's.
+    """
+
+    def __init__(self, schema: ParamsSchema):
+        self.schema = schema
+        self.__kinds = bytearray()
+        self.__values = array.array("d")
+        self.__objects: dict[int, Any] = {}
+        self.__len = 0
+
+    def __grow(self):
+        missing = len(self.schema.keys) - len(self.__kinds)
+        if missing > 0:
+            self.__kinds.extend(bytes(missing))
+            self.__values.frombytes(bytes(missing * self.__values.itemsize))
+
+    def __slot(self, key: str) -> int | None:
+        slot = self.schema.slots.get(key)
+        if slot is None or slot >= len(self.__kinds) or not self.__kinds[slot]:
+            return None
+        return slot
+
+    def __value(self, slot: int) -> Any:
+        kind = self.__kinds[slot]
+        if kind == _FLOAT:
+            return self.__values[slot]
+        if kind == _INT:
+            return int(self.__values[slot])
+        if kind == _BOOL:
+            return self.__values[slot] != 0
+        return self.__objects[slot]
+
+    def __getitem__(self, key: str) -> Any:
+        slot = self.__slot(key)
+        if slot is None:
+            raise KeyError(key)
+        return self.__value(slot)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # jsonpath looks every key up through get()
+        slot = self.__slot(key)
+        if slot is None:
+            return default
+        return self.__value(slot)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.__slot(key) is not None
+
+    def __setitem__(self, key: str, value: Any):
+        slot = self.schema.slot(key)
+        if slot >= len(self.__kinds):
+            self.__grow()
+
+        kind = _kind(value)
+        previous = self.__kinds[slot]
+        if previous == _EMPTY:
+            self.__len += 1
+        elif previous == _OBJECT and kind != _OBJECT:
+            del self.__objects[slot]
+
+        if kind == _OBJECT:
+            self.__objects[slot] = value
+        else:
+            self.__values[slot] = value
+        self.__kinds[slot] = kind
+
+    def __delitem__(self, key: str):
+        slot = self.__slot(key)
+        if slot is None:
+            raise KeyError(key)
+        self.__objects.pop(slot, None)
+        self.__kinds[slot] = _EMPTY
+        self.__len -= 1
+
+    def __iter__(self) -> Iterator[str]:
+        keys = self.schema.keys
+        for slot, kind in enumerate(self.__kinds):
+            if kind:
+                yield keys[slot]
+
+    def __len__(self) -> int:
+        return self.__len
+
+    def __repr__(self) -> str:
+        return f"CompactParams({dict(self.items())!r})"
+
+    def copy(self) -> "CompactParams":
+        result = CompactParams(self.schema)
+        result.__kinds = self.__kinds[:]
+        result.__values = self.__values[:]
+        result.__objects = self.__objects.copy()
+        result.__len = self.__len
+        return result
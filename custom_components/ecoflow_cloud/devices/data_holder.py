@@ -1,5 +1,8 @@
+import datetime
 import logging
-from collections.abc import Callable
+import threading
+import time
+from collections.abc import Callable, Mapping, MutableMapping
 from typing import Any, TypeVar
 
 import json
@@ -23,11 +26,19 @@ class BoundFifoList(list):
 
 
 class EcoflowDataHolder:
+    """
+    Frames are merged into `params` in place. `snapshot()` hands the
+    coordinator a copy, made at most once per coordinator tick and only
+    when params changed, so entities evaluating a tick never see a
+    half-applied frame. That copies once per tick instead of once per frame.
+    """
+
     def __init__(
         self,
         extract_quota_message: Callable[[dict[str, Any]], dict[str, Any]],
         module_sn: str | None = None,
         collect_raw: bool = False,
+        params: MutableMapping[str, Any] | None = None,
     ):
         self.__collect_raw = collect_raw
         self.extract_quota_message = extract_quota_message
@@ -45,10 +56,30 @@ class EcoflowDataHolder:
             year=2000, month=1, day=1, hour=0, minute=0, second=0
         )
 
-        self.params = dict[str, Any]()
+        self.params: MutableMapping[str, Any] = (
+            params if params is not None else dict[str, Any]()
+        )
+        self.params_version = 0
+        # params come from the store only, until the first live data frame
+        self.restored = False
+        # frames that only repeated the current values don't create a new snapshot
+        self.params_seen_time = dt.utcnow().replace(
+            year=2000, month=1, day=1, hour=0, minute=0, second=0
+        )
+        self.unchanged_frames = 0
+        # device data frames with params, changed or not (optimistic writes don't count)
+        self.data_frames = 0
+        # monotonic time of the first live data (not restored)
+        self.first_frame_time: float | None = None
+        # called on the event loop with the params after every data frame
+        self.__params_listeners: list[Callable[[Mapping[str, Any]], None]] = []
         self.params_time = dt.utcnow().replace(
             year=2000, month=1, day=1, hour=0, minute=0, second=0
         )
+        # serializes writers and the snapshot copy, sync entity setters write from executor threads
+        self.__params_lock = threading.Lock()
+        self.__snapshot: Mapping[str, Any] = {}
+        self.__snapshot_version = -1
 
         self.status = dict[str, Any]()
         self.status_time = dt.utcnow().replace(
@@ -56,18 +87,25 @@ class EcoflowDataHolder:
         )
 
         self.raw_data = BoundFifoList[dict[str, Any]]()
+        self.__target_exprs: dict[str, Any] = {}
+        self.set_reply_listener: Callable[[dict[str, Any]], None] | None = None
 
-    def last_received_time(self):
+    def last_changed_time(self):
         return max(
             self.status_time, self.params_time, self.get_reply_time, self.set_reply_time
         )
 
+    def last_received_time(self):
+        return max(self.last_changed_time(), self.params_seen_time)
+
     def add_set_message(self, msg: dict[str, Any]):
         self.set.append(msg)
 
     def add_set_reply_message(self, msg: dict[str, Any]):
         self.set_reply.append(msg)
         self.set_reply_time = dt.utcnow()
+        if self.set_reply_listener is not None and msg:
+            self.set_reply_listener(msg)
 
     def add_get_message(self, msg: dict[str, Any]):
         self.get.append(msg)
@@ -84,12 +122,65 @@ class EcoflowDataHolder:
         self.get_reply.append(msg)
         self.get_reply_time = dt.utcnow()
 
-    def update_to_target_state(self, target_state: dict[str, Any]):
-        # key can be xpath!
-        for key, value in target_state.items():
-            jp.parse(key).update(self.params, value)
-
+    def __target_expr(self, key: str):
+        expr = self.__target_exprs.get(key)
+        if expr is None:
+            expr = self.__target_exprs[key] = jp.parse(key)
+        return expr
+
+    def add_params_listener(
+        self, listener: Callable[[Mapping[str, Any]], None]
+    ) -> Callable[[], None]:
+        # lists are replaced, never mutated, a listener may add or remove one while they run
+        self.__params_listeners = [*self.__params_listeners, listener]
+
+        def remove():
+            self.__params_listeners = [
+                other for other in self.__params_listeners if other is not listener
+            ]
+
+        return remove
+
+    def restore(self, params: Mapping[str, Any], params_time: datetime.datetime):
+        """Seed params with persisted values, keeping their (old) time so they count as stale."""
+        self.__publish_params(lambda current: current.update(params))
+        self.params_time = params_time
+        self.restored = True
+
+    def snapshot(self) -> tuple[int, Mapping[str, Any]]:
+        """Params as of now, a copy that later frames don't change."""
+        with self.__params_lock:
+            if self.__snapshot_version != self.params_version:
+                self.__snapshot = self.params.copy()
+                self.__snapshot_version = self.params_version
+            return self.__snapshot_version, self.__snapshot
+
+    def __publish_params(self, apply: Callable[[MutableMapping[str, Any]], None]):
+        with self.__params_lock:
+            apply(self.params)
+            self.params_version += 1
+
+    def target_state_values(self, keys) -> dict[str, Any]:
+        params = self.params
+        result = {}
+        for key in keys:
+            values = self.__target_expr(key).find(params)
+            if len(values) == 1:
+                result[key] = values[0].value
+        return result
+
+    def update_to_target_state(self, target_state: dict[str, Any]) -> dict[str, Any]:
+        """Apply target state and return the previous values of the updated keys."""
+        previous = self.target_state_values(target_state.keys())
+
+        def apply(params: MutableMapping[str, Any]):
+            # key can be xpath!
+            for key, value in target_state.items():
+                self.__target_expr(key).update(params, value)
+
+        self.__publish_params(apply)
         self.params_time = dt.utcnow()
+        return previous
 
     def update_status(self, raw: dict[str, Any]):
         if raw is None or "params" not in raw or "status" not in raw["params"]:
@@ -100,6 +191,8 @@ class EcoflowDataHolder:
 
     def update_data(self, raw: dict[str, Any]):
         if raw is not None:
+            if self.first_frame_time is None:
+                self.first_frame_time = time.monotonic()
             self.__add_raw_data(raw)
             try:
                 if self.module_sn is not None:
@@ -108,12 +201,36 @@ class EcoflowDataHolder:
                     if raw["moduleSn"] != self.module_sn:
                         return
                 if "params" in raw:
-                    self.params.update(raw["params"])
-                    self.params_time = dt.utcnow()
+                    self.data_frames += 1
+                    self.restored = False
+                    if self.__is_current(raw["params"]):
+                        self.unchanged_frames += 1
+                        self.params_seen_time = dt.utcnow()
+                    else:
+                        self.__publish_params(
+                            lambda params: params.update(raw["params"])
+                        )
+                        self.params_time = dt.utcnow()
+                    for listener in self.__params_listeners:
+                        listener(self.params)
 
             except Exception as error:
                 _LOGGER.error("Error updating data: %s", error)
 
+    def repeated_frame(self):
+        """A data frame identical to the last merged one arrived, nothing to merge."""
+        self.data_frames += 1
+        self.unchanged_frames += 1
+        self.params_seen_time = dt.utcnow()
+
+    def __is_current(self, new_params: dict[str, Any]) -> bool:
+        params = self.params
+        missing = object()
+        for key, value in new_params.items():
+            if params.get(key, missing) != value:
+                return False
+        return True
+
     def __add_raw_data(self, raw: dict[str, Any]):
         if self.__collect_raw:
             self.raw_data.append(raw)
@@ -0,0 +1,126 @@
+import dataclasses
+import logging
+from collections.abc import Callable, Mapping, Sequence
+from typing import Any
+
+from homeassistant.const import Platform
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+
+from .data_holder import EcoflowDataHolder
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class EntityFactory:
+    """Entities of one platform built once all `prefixes` show up in the params."""
+
+    platform: Platform
+    # a prefix matches the key itself and every key below it ("a.b" matches "a.b.c"),
+    # the empty prefix matches as soon as the device reported anything
+    prefixes: tuple[str, ...]
+    build: Callable[[Mapping[str, Any]], Sequence[Entity]]
+
+
+class EntityDiscovery:
+    """
+    Adds the entities of a device whose shape depends on its data.
+
+    Platforms hand over their AddEntitiesCallback on setup. Factories run
+    as soon as their keys are in the params (restored or live) and the
+    platform is set up, so neither setup nor a late module needs to wait for
+    or reload on the first quota. New keys only ever grow the params, so
+    frames are only looked at when the key count changed and the listener is
+    dropped once every factory has run.
+    """
+
+    def __init__(self, holder: EcoflowDataHolder):
+        self.__holder = holder
+        self.__pending: list[EntityFactory] = []
+        self.__adders: dict[Platform, Callable[[Sequence[Entity]], None]] = {}
+        self.__unique_ids: dict[Platform, set[str]] = {}
+        self.__key_count = -1
+        self.__remove_listener: Callable[[], None] | None = None
+        self.discovered = 0
+
+    @callback
+    def register(self, factories: Sequence[EntityFactory]):
+        self.__pending.extend(factories)
+        if self.__pending and self.__remove_listener is None:
+            self.__remove_listener = self.__holder.add_params_listener(self.__on_frame)
+        if self.__adders:
+            # registered after setup, the platforms may take them right away
+            self.__discover()
+
+    @callback
+    def platform_ready(
+        self, platform: Platform, add_entities: Callable[[Sequence[Entity]], None]
+    ):
+        self.__adders[platform] = add_entities
+        self.__discover()
+
+    @callback
+    def stop(self):
+        self.__pending.clear()
+        self.__adders.clear()
+        if self.__remove_listener is not None:
+            self.__remove_listener()
+            self.__remove_listener = None
+
+    @callback
+    def __on_frame(self, params: Mapping[str, Any]):
+        if len(params) != self.__key_count:
+            self.__discover()
+
+    @callback
+    def __discover(self):
+        params = self.__holder.params
+        self.__key_count = len(params)
+        ready = [
+            factory
+            for factory in self.__pending
+            if factory.platform in self.__adders
+            and all(self.__present(params, prefix) for prefix in factory.prefixes)
+        ]
+        for factory in ready:
+            self.__pending.remove(factory)
+            try:
+                entities = factory.build(params)
+            except Exception as error:
+                _LOGGER.error("Error building %s entities: %s", factory.platform, error)
+                continue
+            self.__add(factory.platform, entities)
+        if not self.__pending and self.__remove_listener is not None:
+            self.__remove_listener()
+            self.__remove_listener = None
+
+    def __add(self, platform: Platform, entities: Sequence[Entity]):
+        unique_ids = self.__unique_ids.setdefault(platform, set())
+        new_entities = []
+        for entity in entities:
+            if entity.unique_id in unique_ids:
+                continue
+            unique_ids.add(entity.unique_id)
+            new_entities.append(entity)
+        if new_entities:
+            self.discovered += len(new_entities)
+            self.__adders[platform](new_entities)
+
+    @staticmethod
+    def __present(params: Mapping[str, Any], prefix: str) -> bool:
+        if not prefix:
+            return len(params) > 0
+        if prefix in params:
+            return True
+        prefix = prefix + "."
+        return any(key.startswith(prefix) for key in params)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "pending": [
+                {"platform": str(factory.platform), "prefixes": list(factory.prefixes)}
+                for factory in self.__pending
+            ],
+            "discovered": self.discovered,
+        }
@@ -0,0 +1,128 @@
+import sys
+from typing import Any
+
+
+KEY_TABLE_MAX_SIZE = 4096
+
+
+class KeyTable:
+    """
+    Canonical `prefix + field` key strings, built lazily and reused across frames.
+
+    Looking up an existing key allocates nothing, so params keep receiving the
+    same string objects (with their cached hash) on every frame.
+    """
+
+    def __init__(self, max_size: int = KEY_TABLE_MAX_SIZE):
+        self.max_size = max_size
+        # stored keys plus prefix entries, both bounded by max_size
+        self.size = 0
+        self.__keys: dict[str, dict[str | int, str]] = {}
+
+    def key(self, prefix: str, field: str) -> str:
+        fields = self.__fields(prefix)
+        key = fields.get(field) if fields is not None else None
+        if key is None:
+            key = self.__store(prefix, fields, field, prefix + field)
+        return key
+
+    def index(self, prefix: str, index: int) -> str:
+        fields = self.__fields(prefix)
+        key = fields.get(index) if fields is not None else None
+        if key is None:
+            key = self.__store(prefix, fields, index, f"{prefix}[{index}]")
+        return key
+
+    def __fields(self, prefix: str) -> dict[str | int, str] | None:
+        return self.__keys.get(prefix)
+
+    def __store(
+        self,
+        prefix: str,
+        fields: dict[str | int, str] | None,
+        field: str | int,
+        key: str,
+    ) -> str:
+        # payloads with unbounded key sets (ids as keys) must not grow the table
+        # forever, once full keys are built without being stored
+        if self.size >= self.max_size:
+            return key
+        key = sys.intern(key)
+        if fields is None:
+            if self.size + 2 > self.max_size:
+                return key
+            fields = self.__keys[prefix] = {}
+            self.size += 1
+        fields[field] = key
+        self.size += 1
+        return key
+
+
+class Flattener:
+    """
+    Single pass flattening of nested payloads into a flat params dict.
+
+    :param sep: separator between a parent key and its child keys
+    :param keep_branches: also store dict/list values under their own key
+    :param index_lists: descend into lists as `key[i]`
+    :param max_depth: number of nested levels to expand (None = unlimited)
+    :param merge_keys: top level keys whose dict content is merged into the
+        top level instead of becoming a branch (e.g. `param` / `params`)
+    :param keys: key table used to build the keys (a private one by default)
+    """
+
+    def __init__(
+        self,
+        sep: str = ".",
+        keep_branches: bool = False,
+        index_lists: bool = False,
+        max_depth: int | None = None,
+        merge_keys: tuple[str, ...] = (),
+        keys: KeyTable | None = None,
+    ):
+        self.sep = sep
+        self.keep_branches = keep_branches
+        self.index_lists = index_lists
+        self.max_depth = max_depth
+        self.merge_keys = merge_keys
+        self.keys = keys or KeyTable()
+
+    def flatten(
+        self,
+        source: dict[str, Any],
+        prefix: str = "",
+        target: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        if target is None:
+            target = {}
+        keys = self.keys
+
+        for merge_key in self.merge_keys:
+            merged = source.get(merge_key)
+            if isinstance(merged, dict):
+                for key, value in merged.items():
+                    self.__add(keys.key(prefix, key), value, target, 0)
+
+        for key, value in source.items():
+            if key in self.merge_keys:
+                continue
+            self.__add(keys.key(prefix, key), value, target, 0)
+
+        return target
+
+    def __add(self, key: str, value: Any, target: dict[str, Any], depth: int):
+        if self.max_depth is not None and depth >= self.max_depth:
+            target[key] = value
+        elif isinstance(value, dict):
+            if self.keep_branches:
+                target[key] = value
+            base = self.keys.key(key, self.sep)
+            for child_key, child_value in value.items():
+                self.__add(self.keys.key(base, child_key), child_value, target, depth + 1)
+        elif self.index_lists and isinstance(value, list):
+            if self.keep_branches:
+                target[key] = value
+            for index, item in enumerate(value):
+                self.__add(self.keys.index(key, index), item, target, depth + 1)
+        else:
+            target[key] = value
@@ -0,0 +1,101 @@
+import collections
+import dataclasses
+import time
+from collections.abc import Iterable
+from typing import Any
+
+
+@dataclasses.dataclass
+class _CachedFrame:
+    payload: bytes
+    raw: dict[str, Any]
+    decoded_time: float
+
+
+class FrameCache:
+    """
+    Decoded form of the last few frames per telemetry topic.
+
+    Frames are looked up by a hash of the raw payload (confirmed with a byte
+    compare), so a byte-identical frame repeated within `window` seconds
+    reuses the decoded frame instead of going through base64/protobuf/JSON
+    decoding again. Entries are re-decoded at least every `window` seconds.
+
+    The last merged frame per topic is remembered with the params version it
+    left behind. The same frame again, with params unchanged since, would
+    merge nothing and is skipped before decoding.
+    """
+
+    def __init__(self, topics: Iterable[str], window: float = 60.0, size: int = 8):
+        self.window = window
+        self.size = size
+        self.__topics = [topic for topic in topics if topic]
+        self.clear()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_skipped = 0
+        self.repeats = 0
+
+    def get(self, topic: str, payload: bytes) -> dict[str, Any] | None:
+        frames = self.__frames.get(topic)
+        if frames is None:
+            return None
+        key = hash(payload)
+        frame = frames.get(key)
+        if (
+            frame is None
+            or frame.payload != payload
+            or time.monotonic() - frame.decoded_time > self.window
+        ):
+            self.misses += 1
+            return None
+        frames.move_to_end(key)
+        self.hits += 1
+        self.bytes_skipped += len(payload)
+        return frame.raw
+
+    def put(self, topic: str, payload: bytes, raw: dict[str, Any]):
+        frames = self.__frames.get(topic)
+        if frames is None:
+            return
+        key = hash(payload)
+        frames[key] = _CachedFrame(payload, raw, time.monotonic())
+        frames.move_to_end(key)
+        while len(frames) > self.size:
+            frames.popitem(last=False)
+
+    def repeated(self, topic: str, payload: bytes, params_version: int) -> bool:
+        """True if `payload` is the last merged frame of `topic` and params didn't change since."""
+        last = self.__merged.get(topic)
+        if (
+            last is None
+            or last[2] != params_version
+            or last[0] != hash(payload)
+            or last[1] != payload
+        ):
+            return False
+        self.repeats += 1
+        self.bytes_skipped += len(payload)
+        return True
+
+    def merged(self, topic: str, payload: bytes, params_version: int):
+        if topic in self.__frames:
+            self.__merged[topic] = (hash(payload), payload, params_version)
+
+    def clear(self):
+        # on the event loop like the lookups, entries decoded with the old wanted fields are dropped
+        self.__frames = {
+            topic: collections.OrderedDict[int, _CachedFrame]()
+            for topic in self.__topics
+        }
+        self.__merged: dict[str, tuple[int, bytes, int]] = {}
+
+    def as_dict(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "bytes_skipped": self.bytes_skipped,
+            "repeats": self.repeats,
+        }
@@ -4,6 +4,8 @@ from typing import Any, override
 from custom_components.ecoflow_cloud.api import EcoflowApiClient
 from custom_components.ecoflow_cloud.devices import BaseDevice, const
 from custom_components.ecoflow_cloud.devices.internal.proto import ef_dp3_iobroker_pb2 as pb2
+from custom_components.ecoflow_cloud.devices.flatten import Flattener
+from custom_components.ecoflow_cloud.devices.tracer import command_key
 from custom_components.ecoflow_cloud.entities import (
     BaseNumberEntity,
     BaseSelectEntity,
@@ -42,6 +44,8 @@ from custom_components.ecoflow_cloud.switch import BeeperEntity, EnabledEntity
 
 _LOGGER = logging.getLogger(__name__)
 
+_FLATTENER = Flattener(sep="_")
+
 # Message type mapping for BMS heartbeat related reports
 # These (cmdFunc, cmdId) pairs are known to map to BMSHeartBeatReport
 BMS_HEARTBEAT_COMMANDS: set[tuple[int, int]] = {
@@ -343,13 +347,9 @@ class DeltaPro3(BaseDevice):
     @override
     def _prepare_data(self, raw_data: bytes) -> dict[str, Any]:
         """Prepare Delta Pro 3 data by decoding protobuf and flattening fields."""
-        _LOGGER.debug(f"[DeltaPro3] _prepare_data called with {len(raw_data)} bytes")
-
         flat_dict: dict[str, Any] | None = None
         decoded_data: dict[str, Any] | None = None
         try:
-            _LOGGER.debug(f"Processing {len(raw_data)} bytes of raw data")
-
             # 1. Decode HeaderMessage
             header_info = self._decode_header_message(raw_data)
             if not header_info:
@@ -367,13 +367,19 @@ class DeltaPro3(BaseDevice):
 
             # 4. Protobuf message decode
             decoded_data = self._decode_message_by_type(decoded_pdata, header_info)
-            if not decoded_data:
-                _LOGGER.warning("Message decoding failed")
+            if decoded_data is None:
+                # decode errors are logged above
                 return {}
+            if not decoded_data:
+                # decoded, but no field is wanted: still proof the device is sending
+                return {
+                    "cmdFunc": header_info["cmdFunc"],
+                    "cmdId": header_info["cmdId"],
+                    "params": {},
+                }
 
             # 5. Flatten all fields for params
             flat_dict = self._flatten_dict(decoded_data)
-            _LOGGER.debug(f"Flat dict for params (all fields): {flat_dict}")  # noqa: G004
         except Exception as e:
             _LOGGER.error(f"[DeltaPro3] Data processing failed: {e}", exc_info=True)
             _LOGGER.debug("[DeltaPro3] Attempting JSON fallback after protobuf failure")
@@ -385,12 +391,40 @@ class DeltaPro3(BaseDevice):
                 return {}
 
         # Home Assistant expects a dict with 'params' on success
-        _LOGGER.debug(f"[DeltaPro3] Successfully processed protobuf data, returning {len(flat_dict or {})} fields")
         return {
+            "cmdFunc": header_info["cmdFunc"],
+            "cmdId": header_info["cmdId"],
             "params": flat_dict or {},
             "all_fields": decoded_data or {},
         }
 
+    def _prepare_set_reply(self, raw_data: bytes) -> dict[str, Any]:
+        """Decode a set_reply: header seq (matched with the command) and the setReply payload."""
+        if raw_data[:1] == b"{":
+            return BaseDevice._prepare_data(self, raw_data)
+        header_info = self._decode_header_message(raw_data)
+        if not header_info:
+            return {}
+        header = header_info["header_obj"]
+        reply: dict[str, Any] = {
+            "seq": header_info["seq"],
+            "cmdFunc": header_info["cmdFunc"],
+            "cmdId": header_info["cmdId"],
+        }
+        if header.HasField("code"):
+            reply["code"] = header.code
+        pdata = getattr(header, "pdata", b"")
+        if pdata:
+            try:
+                msg = pb2.setReply_dp3()
+                msg.ParseFromString(self._perform_xor_decode(pdata, header_info))
+                reply["data"] = self._protobuf_to_dict(msg, selective=False)
+                if msg.HasField("configOk"):
+                    reply["data"]["configOk"] = msg.configOk
+            except Exception as e:
+                _LOGGER.debug("setReply decode failed: %s", e)
+        return reply
+
     def _decode_header_message(self, raw_data: bytes) -> dict[str, Any] | None:
         """Decode HeaderMessage and extract header info."""
         try:
@@ -398,11 +432,9 @@ class DeltaPro3(BaseDevice):
             import base64
 
             try:
-                decoded_payload = base64.b64decode(raw_data, validate=True)
-                _LOGGER.debug("Base64 decode successful")
-                raw_data = decoded_payload
+                raw_data = base64.b64decode(raw_data, validate=True)
             except Exception:
-                _LOGGER.debug("Data is not Base64 encoded, using as-is")
+                pass
 
             # Try to decode as HeaderMessage
             try:
@@ -414,7 +446,8 @@ class DeltaPro3(BaseDevice):
                 return None
             except Exception as e:
                 _LOGGER.error(f"Failed to parse HeaderMessage: {e}")
-                _LOGGER.debug(f"Raw data length: {len(raw_data)}, first 20 bytes: {raw_data[:20].hex()}")
+                if self.tracer.enabled:
+                    self.tracer.record("header", raw_data)
                 return None
 
             if not header_msg.header:
@@ -441,11 +474,10 @@ class DeltaPro3(BaseDevice):
                 "header_obj": header,
             }
 
-            _LOGGER.debug(f"Header decoded: cmdFunc={header_info['cmdFunc']}, cmdId={header_info['cmdId']}")
             return header_info
 
         except Exception as e:
-            _LOGGER.debug(f"HeaderMessage decode failed: {e}")
+            _LOGGER.debug("HeaderMessage decode failed: %s", e)
             return None
 
     def _extract_payload_data(self, header_obj: Any) -> bytes | None:
@@ -453,7 +485,6 @@ class DeltaPro3(BaseDevice):
         try:
             pdata = getattr(header_obj, "pdata", b"")
             if pdata:
-                _LOGGER.debug(f"Extracted {len(pdata)} bytes of payload data")
                 return pdata
             else:
                 _LOGGER.warning("No pdata found in header")
@@ -485,14 +516,12 @@ class DeltaPro3(BaseDevice):
 
         return bytes(decoded_payload)
 
-    def _decode_message_by_type(self, pdata: bytes, header_info: dict[str, Any]) -> dict[str, Any]:
-        """Decode protobuf message based on cmdFunc/cmdId."""
+    def _decode_message_by_type(self, pdata: bytes, header_info: dict[str, Any]) -> dict[str, Any] | None:
+        """Decode protobuf message based on cmdFunc/cmdId, None if it can't be decoded."""
         cmd_func = header_info.get("cmdFunc", 0)
         cmd_id = header_info.get("cmdId", 0)
 
         try:
-            _LOGGER.debug(f"Decoding message: cmdFunc={cmd_func}, cmdId={cmd_id}, size={len(pdata)} bytes")
-
             if cmd_func == 254 and cmd_id == 21:
                 # DisplayPropertyUpload
                 msg = pb2.DisplayPropertyUpload()
@@ -561,10 +590,11 @@ class DeltaPro3(BaseDevice):
                 try:
                     msg = pb2.BMSHeartBeatReport()
                     msg.ParseFromString(pdata)
-                    _LOGGER.info(f"Successfully decoded BMSHeartBeatReport: cmdFunc={cmd_func}, cmdId={cmd_id}")
                     return self._protobuf_to_dict(msg)
                 except Exception as e:
-                    _LOGGER.debug(f"Failed to decode as BMSHeartBeatReport (cmdFunc={cmd_func}, cmdId={cmd_id}): {e}")
+                    _LOGGER.debug(
+                        "Failed to decode as BMSHeartBeatReport (cmdFunc=%s, cmdId=%s): %s", cmd_func, cmd_id, e
+                    )
                     # Fall through to unknown message type
 
             # Unknown message type - try BMSHeartBeatReport as fallback
@@ -574,7 +604,7 @@ class DeltaPro3(BaseDevice):
             try:
                 msg = pb2.BMSHeartBeatReport()
                 msg.ParseFromString(pdata)
-                result = self._protobuf_to_dict(msg)
+                result = self._protobuf_to_dict(msg, selective=False)
                 # Check if we got meaningful data (cycles or energy fields)
                 if "cycles" in result or "accu_chg_energy" in result or "accu_dsg_energy" in result:
                     _LOGGER.warning(
@@ -583,39 +613,31 @@ class DeltaPro3(BaseDevice):
                     )
                     return result
             except Exception as e:
-                _LOGGER.debug(f"Failed fallback BMSHeartBeatReport decode: {e}")
+                _LOGGER.debug("Failed fallback BMSHeartBeatReport decode: %s", e)
 
-            return {}
+            return None
 
         except Exception as e:
             _LOGGER.error(f"Message decode error for cmdFunc={cmd_func}, cmdId={cmd_id}: {e}")
-            return {}
+            return None
 
     def _is_bms_heartbeat(self, cmd_func: int, cmd_id: int) -> bool:
         """Return True if the pair maps to a BMSHeartBeatReport message."""
         return (cmd_func, cmd_id) in BMS_HEARTBEAT_COMMANDS
 
-    def _flatten_dict(self, d: dict, parent_key: str = "", sep: str = "_") -> dict:
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(self._flatten_dict(v, new_key, sep=sep).items())
-            else:
-                items.append((new_key, v))
-        return dict(items)
+    def _flatten_dict(self, d: dict) -> dict:
+        return _FLATTENER.flatten(d)
 
-    def _protobuf_to_dict(self, protobuf_obj: Any) -> dict[str, Any]:
+    def _protobuf_to_dict(self, protobuf_obj: Any, selective: bool = True) -> dict[str, Any]:
+        if selective:
+            # only the fields enabled entities read (everything in diagnostic mode)
+            self.wanted.prune(protobuf_obj, sep="_")
         try:
             from google.protobuf.json_format import MessageToDict
 
-            result = MessageToDict(protobuf_obj, preserving_proto_field_name=True)
-            _LOGGER.debug(f"MessageToDict result fields: {len(result)}")
-            return result
+            return MessageToDict(protobuf_obj, preserving_proto_field_name=True)
         except ImportError:
-            result = self._manual_protobuf_to_dict(protobuf_obj)
-            _LOGGER.debug(f"Manual conversion result fields: {len(result)}")
-            return result
+            return self._manual_protobuf_to_dict(protobuf_obj)
 
     def _manual_protobuf_to_dict(self, protobuf_obj: Any) -> dict[str, Any]:
         """Convert protobuf object to dict manually."""
@@ -631,9 +653,7 @@ class DeltaPro3(BaseDevice):
 
     def _transform_data_fields(self, decoded_data: dict[str, Any], header_info: dict[str, Any]) -> dict[str, Any]:
         # Flatten and return all fields
-        flat = self._flatten_dict(decoded_data)
-        _LOGGER.debug(f"Flat dict (all fields to params): {flat}")
-        return flat
+        return self._flatten_dict(decoded_data)
 
     def _extract_unknown_fields(self, decoded_data: dict[str, Any]) -> dict[str, Any]:
         """Extract fields that look like 'unknown*' (flattened)."""
@@ -653,13 +673,17 @@ class DeltaPro3(BaseDevice):
     def update_data(self, raw_data, data_type: str) -> bool:
         """Decode protobuf only for data_topic; otherwise use BaseDevice JSON path."""
         if data_type == self.device_info.data_topic:
-            raw = self._prepare_data(raw_data)
+            if self.skip_repeated_frame(raw_data, data_type):
+                return True
+            data_frames = self.data.data_frames
+            raw = self._decode_cached(raw_data, data_type, self._prepare_data)
             self.data.update_data(raw)
+            self.frame_merged(raw_data, data_type, data_frames)
         elif data_type == self.device_info.set_topic:
             raw = BaseDevice._prepare_data(self, raw_data)
             self.data.add_set_message(raw)
         elif data_type == self.device_info.set_reply_topic:
-            raw = BaseDevice._prepare_data(self, raw_data)
+            raw = self._prepare_set_reply(raw_data)
             self.data.add_set_reply_message(raw)
         elif data_type == self.device_info.get_topic:
             raw = BaseDevice._prepare_data(self, raw_data)
@@ -669,4 +693,6 @@ class DeltaPro3(BaseDevice):
             self.data.add_get_reply_message(raw)
         else:
             return False
+        if self.tracer.enabled:
+            self.tracer.record(command_key(raw), raw_data, raw, data_type)
         return True
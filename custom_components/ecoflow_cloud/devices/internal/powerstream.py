@@ -13,6 +13,7 @@ from custom_components.ecoflow_cloud.select import PowerDictSelectEntity
 from custom_components.ecoflow_cloud.number import MaxBatteryLevelEntity, MinBatteryLevelEntity
 
 from ...devices import BaseDevice
+from ...devices.flatten import KeyTable
 from ...devices.internal.proto.support import (
     to_lower_camel_case,
 )
@@ -50,6 +51,17 @@ from .proto.support.const import WatthType, get_expected_payload_type
 
 _LOGGER = logging.getLogger(__name__)
 
+_KEYS = KeyTable()
+
+
+def _watth_fields(watth_type: WatthType) -> tuple[str, str]:
+    name = to_lower_camel_case(watth_type.name)
+    field_name = f"watth{name[0].upper()}{name[1:]}"
+    return field_name, f"{field_name}Timestamp"
+
+
+_WATTH_FIELDS = {watth_type.value: _watth_fields(watth_type) for watth_type in WatthType}
+
 
 def build_command(
     device_sn: str, command: Command, payload: ProtoMessageRaw
@@ -319,13 +331,6 @@ class PowerStream(PrivateAPIProtoDeviceMixin, BaseDevice):
             packet = ecopacket.SendHeaderMsg()
             _ = packet.ParseFromString(raw_data)
             for message in packet.msg:
-                _LOGGER.debug(
-                    'cmd_func %u, cmd_id %u, payload "%s"',
-                    message.cmd_func,
-                    message.cmd_id,
-                    message.pdata.hex(),
-                )
-
                 if (
                     message.HasField("device_sn")
                     and message.device_sn != self.device_data.sn
@@ -351,11 +356,13 @@ class PowerStream(PrivateAPIProtoDeviceMixin, BaseDevice):
                     continue
 
                 params = cast(JSONDict, res.setdefault("params", {}))
+                prefix = f"{command.func}_{command.id}."
                 if command in {Command.PRIVATE_API_POWERSTREAM_HEARTBEAT}:
                     payload = get_expected_payload_type(command)()
                     _ = payload.ParseFromString(message.pdata)
+                    self.wanted.prune(payload, prefix, json_names=True)
                     params.update(
-                        (f"{command.func}_{command.id}.{key}", value)
+                        (_KEYS.key(prefix, key), value)
                         for key, value in cast(
                             JSONDict,
                             MessageToDict(payload, preserving_proto_field_name=False),
@@ -365,28 +372,17 @@ class PowerStream(PrivateAPIProtoDeviceMixin, BaseDevice):
                     payload = platform.BatchEnergyTotalReport()
                     _ = payload.ParseFromString(message.pdata)
                     for watth_item in payload.watth_item:
-                        try:
-                            watth_type_name = to_lower_camel_case(
-                                WatthType(watth_item.watth_type).name
-                            )
-                        except ValueError:
+                        fields = _WATTH_FIELDS.get(watth_item.watth_type)
+                        if fields is None:
                             continue
 
-                        field_name = (
-                            f"watth{watth_type_name[0].upper()}{watth_type_name[1:]}"
-                        )
-                        params.update(
-                            {
-                                f"{command.func}_{command.id}.{field_name}": sum(
-                                    watth_item.watth
-                                ),
-                                f"{command.func}_{command.id}.{field_name}Timestamp": watth_item.timestamp,
-                            }
-                        )
+                        params[_KEYS.key(prefix, fields[0])] = sum(watth_item.watth)
+                        params[_KEYS.key(prefix, fields[1])] = watth_item.timestamp
 
                 # Add cmd information to allow extraction in private_api_extract_quota_message
                 res["cmdFunc"] = command_desc.func
                 res["cmdId"] = command_desc.id
+                res["seq"] = message.seq
                 res["timestamp"] = dt.utcnow()
                 continue
         except Exception as error:
@@ -76,6 +76,7 @@ class ProtoMessage(PrivateAPIMessageProtocol, Message):
             message.need_ack = self.need_ack
 
         message.seq = JSONMessage.gen_seq()
+        self.message_id = str(message.seq)
 
         return packet
 
@@ -83,6 +84,7 @@ class ProtoMessage(PrivateAPIMessageProtocol, Message):
         from google.protobuf.json_format import MessageToDict
 
         packet = JSONMessage.prepare_payload({})
+        self.message_id = str(packet["id"])
 
         if self.device_sn is not None:
             packet["sn"] = self.device_sn
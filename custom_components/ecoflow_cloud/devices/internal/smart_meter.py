@@ -12,6 +12,8 @@ from homeassistant.util import dt # pyright: ignore[reportMissingImports]
 from ...api import EcoflowApiClient
 from ...api.message import JSONDict
 from ...devices import const, BaseDevice
+from ...devices.flatten import Flattener
+from ...devices.tracer import command_key
 from ...entities import BaseSensorEntity, BaseNumberEntity, BaseSwitchEntity, BaseSelectEntity
 from ...sensor import MiscSensorEntity, VoltSensorEntity, WattsSensorEntity, InAmpSensorEntity, \
     EnergySensorEntity, MiscBinarySensorEntity, QuotaStatusSensorEntity, StatusSensorEntity
@@ -25,6 +27,8 @@ from .proto.support.const import Command, CommandFuncAndId, get_expected_payload
 
 _LOGGER = logging.getLogger(__name__)
 
+_FLATTENER = Flattener()
+
 class SmartMeter(BaseDevice):
     @override
     def private_api_extract_quota_message(self, message: JSONDict) -> dict[str, Any]:
@@ -105,9 +109,16 @@ class SmartMeter(BaseDevice):
         ]
     
     def update_data(self, raw_data: bytes, data_type: str) -> bool:
+        raw: dict[str, Any] | None = None
         if data_type == self.device_info.data_topic:
-            raw = self._prepare_data_data_topic(raw_data)
+            if self.skip_repeated_frame(raw_data, data_type):
+                return True
+            data_frames = self.data.data_frames
+            raw = self._decode_cached(
+                raw_data, data_type, self._prepare_data_data_topic
+            )
             self.data.update_data(raw)
+            self.frame_merged(raw_data, data_type, data_frames)
         elif data_type == self.device_info.set_topic:
             # Commands send from HomeAssistant
             pass
@@ -121,17 +132,20 @@ class SmartMeter(BaseDevice):
             raw = self._prepare_data_get_reply_topic(raw_data)
             self.data.add_get_reply_message(raw)
         elif data_type == self.device_info.status_topic:
-            raw = self._prepare_data_status_topic(raw_data)
+            raw = self._decode_cached(
+                raw_data, data_type, self._prepare_data_status_topic
+            )
             self.data.update_status(raw)
         else:
             return False
+        if self.tracer.enabled and raw is not None:
+            self.tracer.record(command_key(raw), raw_data, raw, data_type)
         return True
 
     @override
     def _prepare_data(self, raw_data: bytes) -> dict[str, Any]:
         res: dict[str, Any] = {"params": {}}
         from google.protobuf.json_format import MessageToDict # pyright: ignore[reportMissingModuleSource]
-        from .proto.support import flatten_dict
 
         from .proto.ecopacket_pb2 import SendHeaderMsg
         from .proto.support.const import Command, CommandFuncAndId
@@ -140,13 +154,6 @@ class SmartMeter(BaseDevice):
             packet = SendHeaderMsg()
             _ = packet.ParseFromString(raw_data)
             for message in packet.msg:
-                _LOGGER.debug(
-                    'cmd_func %u, cmd_id %u, payload "%s"',
-                    message.cmd_func,
-                    message.cmd_id,
-                    message.pdata.hex(),
-                )
-
                 if (
                     message.HasField("device_sn")
                     and message.device_sn != self.device_data.sn
@@ -179,12 +186,10 @@ class SmartMeter(BaseDevice):
                             message.pdata = bytes([byte ^ (message.seq % 256) for byte in message.pdata])
 
                         _ = payload.ParseFromString(message.pdata)
-                        params.update(
-                            (f"{command.func}_{command.id}.{key}", value)
-                            for key, value in cast(
-                                JSONDict,
-                                flatten_dict(MessageToDict(payload, preserving_proto_field_name=False)),
-                            ).items()
+                        _FLATTENER.flatten(
+                            MessageToDict(payload, preserving_proto_field_name=False),
+                            f"{command.func}_{command.id}.",
+                            params,
                         )
                     except Exception as e:
                         pass
@@ -192,6 +197,7 @@ class SmartMeter(BaseDevice):
                 # Add cmd information to allow extraction in private_api_extract_quota_message
                 res["cmdFunc"] = command_desc.func
                 res["cmdId"] = command_desc.id
+                res["seq"] = message.seq
                 res["timestamp"] = dt.utcnow()
         except Exception as error:
             _LOGGER.error(error)
@@ -279,20 +279,20 @@ class StreamAC(BaseDevice):
             payload =raw_data
 
             while True:
-                _LOGGER.debug("payload \"%s\"", payload.hex())
                 packet = stream_ac.SendHeaderStreamMsg()
                 packet.ParseFromString(payload)
 
-                if hasattr(packet.msg, "pdata") :
-                    _LOGGER.debug("cmd id \"%u\" fct id \"%u\" content \"%s\" - pdata:\"%s\"", packet.msg.cmd_id, packet.msg.cmd_func, str(packet), str(packet.msg.pdata.hex()))
-                else :
-                    _LOGGER.debug("cmd id \"%u\" fct id \"%u\" content \"%s\"", packet.msg.cmd_id, str(packet))
+                if self.tracer.enabled:
+                    self.tracer.record(
+                        f"{packet.msg.cmd_func}_{packet.msg.cmd_id}",
+                        payload,
+                        lambda: str(packet),
+                    )
 
                 if packet.msg.cmd_id < 0: #packet.msg.cmd_id != 21 and packet.msg.cmd_id != 22 and packet.msg.cmd_id != 50:
                     _LOGGER.info("Unsupported EcoPacket cmd id %u", packet.msg.cmd_id)
 
                 else:
-                    _LOGGER.debug("new payload \"%s\"",str(packet.msg.pdata.hex()))
                     # paquet HeaderStream
                     if packet.msg.cmd_id > 0:
                         self._parsedata(packet, stream_ac2.HeaderStream(), raw)
@@ -313,14 +313,14 @@ class StreamAC(BaseDevice):
                     if packet.msg.cmd_id > 0:
                         self._parsedata(packet, stream_ac2.Champ_cmd50_3(), raw)
 
-                    _LOGGER.info("Found %u fields", len(raw["params"]))
+                    _LOGGER.debug("Found %u fields", len(raw["params"]))
 
                     raw["timestamp"] = utcnow()
 
                 if packet.ByteSize() >= len(payload):
                     break
 
-                _LOGGER.info("Found another frame in payload")
+                _LOGGER.debug("Found another frame in payload")
 
                 packet_length = len(payload) - packet.ByteSize()
                 payload = payload[:packet_length]
@@ -335,9 +335,6 @@ class StreamAC(BaseDevice):
             if hasattr(packet.msg, "pdata") and len(packet.msg.pdata) > 0 :
                 content.ParseFromString(packet.msg.pdata)
 
-                if len(str(content)) > 0:
-                    _LOGGER.debug("initial cmd id \"%u\" fct id \"%u\" msg \n\"%s\"", packet.msg.cmd_id, packet.msg.cmd_func, str(content))
-
                 for descriptor in content.DESCRIPTOR.fields:
                     if not content.HasField(descriptor.name):
                         continue
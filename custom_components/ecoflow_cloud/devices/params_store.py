@@ -0,0 +1,102 @@
+import datetime
+import logging
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt
+
+from . import BaseDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+SAVE_INTERVAL = datetime.timedelta(minutes=5)
+
+_PLAIN_TYPES = (str, int, float, bool, list, dict, type(None))
+
+
+class ParamsStore:
+    """
+    Last known params of the devices of one config entry, kept in HA storage.
+
+    Saved every SAVE_INTERVAL and on shutdown, and loaded on setup so the
+    entities start with the last values (marked stale by their old
+    params_time) instead of unknown.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self.__hass = hass
+        self.__store = Store[dict[str, Any]](
+            hass, STORAGE_VERSION, f"ecoflow_cloud.params.{entry_id}"
+        )
+        self.__devices: dict[str, BaseDevice] = {}
+
+    async def async_load(self) -> dict[str, dict[str, Any]]:
+        try:
+            return (await self.__store.async_load()) or {}
+        except Exception as error:
+            _LOGGER.warning("Can't load stored device params: %s", error)
+            return {}
+
+    @staticmethod
+    def restored_params(
+        stored: dict[str, Any] | None,
+    ) -> tuple[dict[str, Any], datetime.datetime] | None:
+        if not stored:
+            return None
+        params_time = dt.parse_datetime(stored.get("time", ""))
+        if params_time is None or not stored.get("params"):
+            return None
+        return stored["params"], params_time
+
+    @callback
+    def async_start(
+        self, devices: dict[str, BaseDevice]
+    ) -> Callable[[], Coroutine[Any, Any, None]]:
+        """Start saving periodically, returns the coroutine function that stops it with a last save."""
+        self.__devices = devices
+        cancel_interval = async_track_time_interval(
+            self.__hass, self.__async_save, SAVE_INTERVAL
+        )
+        cancel_stop = self.__hass.bus.async_listen(
+            EVENT_HOMEASSISTANT_STOP, self.__async_save
+        )
+
+        async def stop():
+            cancel_interval()
+            cancel_stop()
+            await self.__async_save()
+
+        return stop
+
+    async def async_remove(self):
+        await self.__store.async_remove()
+
+    async def async_save(self):
+        await self.__store.async_save(self.__data())
+
+    async def __async_save(self, _: datetime.datetime | Event | None = None):
+        try:
+            await self.async_save()
+        except Exception as error:
+            _LOGGER.warning("Can't store device params: %s", error)
+
+    def __data(self) -> dict[str, Any]:
+        result = {}
+        for sn, device in self.__devices.items():
+            if device.data is None or not device.data.params:
+                continue
+            params = device.data.params
+            result[sn] = {
+                "time": device.data.params_time.isoformat(),
+                "params": {
+                    key: value
+                    for key, value in params.items()
+                    if isinstance(value, _PLAIN_TYPES)
+                },
+            }
+        return result
@@ -1,7 +1,12 @@
 import logging
 
+from ..flatten import Flattener
+
 _LOGGER = logging.getLogger(__name__)
 
+# top level keys plus one nested level, `param`/`params` merged into the top level
+PLAIN_FLATTENER = Flattener(keep_branches=True, max_depth=1, merge_keys=("param", "params"))
+
 plain_to_status: dict[str, str] = {
     "pd": "pdStatus",
     "mppt": "mpptStatus",
@@ -17,8 +22,9 @@ plain_to_status: dict[str, str] = {
 status_to_plain = dict((v, k) for (k, v) in plain_to_status.items())
 
 
-def to_plain(raw_data: dict[str, any]) -> dict[str, any]:
-    new_params = {}
+def to_plain(
+    raw_data: dict[str, any], flattener: Flattener = PLAIN_FLATTENER
+) -> dict[str, any]:
     prefix = ""
     if "typeCode" in raw_data:
         prefix1 = status_to_plain.get(
@@ -27,29 +33,5 @@ def to_plain(raw_data: dict[str, any]) -> dict[str, any]:
         prefix += f"{prefix1}."
     elif "cmdFunc" in raw_data and "cmdId" in raw_data:
         prefix += f"{raw_data['cmdFunc']}_{raw_data['cmdId']}."
-    else :
-        prefix += ""
-
-    if "param" in raw_data:
-        for k, v in raw_data["param"].items():
-            new_params[f"{prefix}{k}"] = v
-
-    if "params" in raw_data:
-        for k, v in raw_data["params"].items():
-            new_params[f"{prefix}{k}"] = v
-
-    for k, v in raw_data.items():
-        if k != "param" and k != "params":
-            new_params[f"{prefix}{k}"] = v
-
-    new_params2 = {}
-    for k, v in new_params.items():
-        new_params2[k] = v
-        if isinstance(v, dict):
-            for k2, v2 in v.items():
-                new_params2[f"{k}.{k2}"] = v2
-
-    result = {"params": new_params2, "raw_data": raw_data}
-    _LOGGER.debug(str(result))
 
-    return result
\ No newline at end of file
+    return {"params": flattener.flatten(raw_data, prefix), "raw_data": raw_data}
@@ -1,5 +1,10 @@
+import logging
+from collections.abc import Mapping
 from typing import Any, Callable
 
+from homeassistant.const import Platform
+from homeassistant.core import callback
+
 from ...api import EcoflowApiClient
 from ...device_data import DeviceData
 from ...entities import (
@@ -30,7 +35,106 @@ from ...sensor import (
     TempSensorEntity,
 )
 from ...switch import BitMaskEnableEntity, EnabledEntity
-from .. import BaseDevice, EcoflowDeviceInfo, const
+from .. import BaseDevice, EcoflowDeviceInfo, EntityFactory, const
+
+_LOGGER = logging.getLogger(__name__)
+
+_MODULE_TYPES = ("iclow", "kitscc", "bbcout", "bbcin", "lddc", "ichigh", "ldac")
+
+
+def _is_module_type(device_type: str) -> bool:
+    return device_type.startswith("bp") or device_type in _MODULE_TYPES
+
+
+class _ModuleDiscovery:
+    """
+    Adds modules attached to a PowerKit after setup as sub devices.
+
+    The parent's data topic carries the frames of every module. A frame with
+    a `moduleSn` that is no device yet is looked up in the parent's quota,
+    which lists the modules by type, and a quota refresh is requested once
+    when it isn't there. The new module is configured like one picked in the
+    options flow and its entities go through the parent's entity discovery,
+    so attaching a module needs neither an options change nor a reload.
+    """
+
+    def __init__(self, client: EcoflowApiClient, parent: "PowerKit"):
+        self.__client = client
+        self.__parent = parent
+        # module sns waiting for the quota that tells their type
+        self.__unknown: set[str] = set()
+        self.__requested: set[str] = set()
+        # modules added, or of a type without entities
+        self.__known: set[str] = set()
+        self.__remove_listener: Callable[[], None] | None = None
+
+    @callback
+    def frame(self, module_sn: str | None):
+        if (
+            not module_sn
+            or module_sn == self.__parent.device_data.sn
+            or module_sn in self.__client.devices
+            or module_sn in self.__known
+            or module_sn in self.__unknown
+        ):
+            return
+        if not self.__add(module_sn, self.__parent.data.params):
+            self.__unknown.add(module_sn)
+            if self.__remove_listener is None:
+                self.__remove_listener = self.__parent.data.add_params_listener(
+                    self.__on_params
+                )
+            if module_sn not in self.__requested:
+                self.__requested.add(module_sn)
+                self.__client.request_quota(self.__parent.device_data.sn)
+
+    @callback
+    def stop(self):
+        self.__unknown.clear()
+        if self.__remove_listener is not None:
+            self.__remove_listener()
+            self.__remove_listener = None
+
+    @callback
+    def __on_params(self, params: Mapping[str, Any]):
+        for module_sn in [sn for sn in self.__unknown if self.__add(sn, params)]:
+            self.__unknown.discard(module_sn)
+        if not self.__unknown:
+            self.stop()
+
+    def __add(self, module_sn: str, params: Mapping[str, Any]) -> bool:
+        module_type = next(
+            (
+                key
+                for key, modules in params.items()
+                if isinstance(modules, dict) and module_sn in modules
+            ),
+            None,
+        )
+        if module_type is None:
+            return False
+        self.__known.add(module_sn)
+        if not _is_module_type(module_type):
+            _LOGGER.debug("Ignoring PowerKit module %s of type %s", module_sn, module_type)
+            return True
+
+        parent_data = self.__parent.device_data
+        module = self.__client.configure_device(
+            DeviceData(
+                module_sn,
+                f"{parent_data.name}.{module_type}.{module_sn}",
+                module_type,
+                parent_data.options,
+                None,
+                parent_data,
+            )
+        )
+        module.configure(self.__parent.coordinator.hass)
+        self.__parent.discovery.register(module.module_factories(self.__client))
+        _LOGGER.info(
+            "PowerKit %s: added module %s (%s)", parent_data.sn, module_sn, module_type
+        )
+        return True
 
 
 class PowerKit(BaseDevice):
@@ -81,13 +185,43 @@ class PowerKit(BaseDevice):
             elif device_data.device_type == "ldac":
                 device_data.display_name = f"PowerKit Distrubution Panel AC Out ({childData.parent.sn}.{childData.sn})"
         super().__init__(device_info, device_data)
+        self.modules: _ModuleDiscovery | None = None
 
     def flat_json(self):
         return False
 
     def sensors(self, client: EcoflowApiClient) -> list[BaseSensorEntity]:
-        params = self.data.params
+        return self.moduleSensors(client, self.data.params)
+
+    def numbers(self, client: EcoflowApiClient) -> list[BaseNumberEntity]:
+        return self.moduleNumbers(client)
+
+    def switches(self, client: EcoflowApiClient) -> list[BaseSwitchEntity]:
+        return self.moduleSwitches(client)
+
+    def entity_factories(self, client: EcoflowApiClient) -> list[EntityFactory]:
+        # modules from the options flow get their entities at setup like
+        # other devices, the parent adds the ones attached later
+        if self.device_data.parent is None:
+            self.modules = _ModuleDiscovery(client, self)
+        return []
+
+    def module_factories(self, client: EcoflowApiClient) -> list[EntityFactory]:
+        """Entities of a module added after setup, through the parent's platforms."""
+        return [
+            EntityFactory(Platform.SENSOR, ("",), lambda params: self.sensors(client)),
+            EntityFactory(Platform.NUMBER, ("",), lambda params: self.numbers(client)),
+            EntityFactory(Platform.SWITCH, ("",), lambda params: self.switches(client)),
+        ]
 
+    def apply_data(self, raw: dict[str, Any], data_type: str):
+        super().apply_data(raw, data_type)
+        if self.modules is not None and data_type == self.device_info.data_topic:
+            self.modules.frame(raw.get("moduleSn"))
+
+    def moduleSensors(
+        self, client: EcoflowApiClient, params: Mapping[str, Any]
+    ) -> list[BaseSensorEntity]:
         if self.device_data.device_type.startswith("bp"):
             return self.batterieSensors(client, self.device_data.sn, params)
         elif self.device_data.device_type == "iclow":
@@ -714,7 +848,7 @@ class PowerKit(BaseDevice):
             MiscSensorEntity(client, self, "acChSta", "AC Charge State", True),  # 0
         ]
 
-    def numbers(self, client: EcoflowApiClient) -> list[BaseNumberEntity]:
+    def moduleNumbers(self, client: EcoflowApiClient) -> list[BaseNumberEntity]:
         if self.device_data.device_type == "iclow":
             return [
                 AcChargingPowerInAmpereEntity(
@@ -737,7 +871,7 @@ class PowerKit(BaseDevice):
             ]
         return []
 
-    def switches(self, client: EcoflowApiClient) -> list[BaseSwitchEntity]:
+    def moduleSwitches(self, client: EcoflowApiClient) -> list[BaseSwitchEntity]:
         if self.device_data.device_type == "lddc":
             return [
                 BitMaskEnableEntity(
@@ -1,5 +1,6 @@
 from ...api import EcoflowApiClient
 from .. import BaseDevice
+from ..flatten import Flattener
 from .data_bridge import to_plain
 
 from ...sensor import (
@@ -24,6 +25,11 @@ from typing import Any
 
 _LOGGER = logging.getLogger(__name__)
 
+# every nested level (lists as `key[i]`), keeping the intermediate branches
+_FLATTENER = Flattener(
+    keep_branches=True, index_lists=True, merge_keys=("param", "params")
+)
+
 
 class PowerOcean(BaseDevice):
     def flat_json(self):
@@ -104,29 +110,7 @@ class PowerOcean(BaseDevice):
 
     def _prepare_data(self, raw_data) -> dict[str, "Any"]:
         res = super()._prepare_data(raw_data)
-        _LOGGER.info(f"_prepare_data {raw_data}")
-        res = to_plain(res)
-        params = res.get("params")
-        if isinstance(params, dict):
-            flattened: dict[str, Any] = {}
-            for key, value in list(params.items()):
-                self._flatten_param_branch(key, value, flattened)
-            params.update(flattened)
-        return res
+        return to_plain(res, _FLATTENER)
 
     def _status_sensor(self, client: EcoflowApiClient) -> StatusSensorEntity:
         return StatusSensorEntity(client, self)
-
-    def _flatten_param_branch(
-        self, prefix: str, value: Any, target: dict[str, Any]
-    ) -> None:
-        if isinstance(value, dict):
-            for child_key, child_value in value.items():
-                next_key = f"{prefix}.{child_key}"
-                target[next_key] = child_value
-                self._flatten_param_branch(next_key, child_value, target)
-        elif isinstance(value, list):
-            for index, item in enumerate(value):
-                next_key = f"{prefix}[{index}]"
-                target[next_key] = item
-                self._flatten_param_branch(next_key, item, target)
\ No newline at end of file
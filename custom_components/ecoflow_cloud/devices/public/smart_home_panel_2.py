@@ -1,8 +1,10 @@
 import logging
+from collections.abc import Mapping
+from typing import Any
 
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.components.sensor import SensorDeviceClass
-from homeassistant.const import UnitOfPower
+from homeassistant.const import Platform, UnitOfPower
 
 from custom_components.ecoflow_cloud.select import DictSelectEntity
 from custom_components.ecoflow_cloud.switch import EnabledEntity
@@ -26,30 +28,17 @@ from ...sensor import (
     VoltSensorEntity,
     WattsSensorEntity,
 )
-from .. import BaseDevice, const
+from .. import BaseDevice, EntityFactory, const
+from .data_bridge import PLAIN_FLATTENER
 
 _LOGGER = logging.getLogger(__name__)
 
+CIRCUIT_INFO = "pd303_mc.loadIncreInfo.hall1IncreInfo.ch%dInfo"
+BACKUP_IS_READY = "pd303_mc.backupIncreInfo.ch%dInfo.backupIsReady"
+
 class SmartHomePanel2(BaseDevice):
 
     def sensors(self, client: EcoflowApiClient) -> list[BaseSensorEntity]:
-
-        # Find all split-phase circuits
-        circuits = []
-        for x in range(1,13):
-            name: str = self.data.params[f"pd303_mc.loadIncreInfo.hall1IncreInfo.ch{x}Info.chName"]
-            is_split: bool = self.data.params[f'pd303_mc.loadIncreInfo.hall1IncreInfo.ch{x}Info.splitphase.linkMark']
-            split_reference: int = self.data.params[f'pd303_mc.loadIncreInfo.hall1IncreInfo.ch{x}Info.splitphase.linkCh']
-
-            if is_split:
-                if x < split_reference: # The first of the split pair
-                    # Add our combined split circuit
-                    circuits.append(self._sensorsCircuit(client, x, name, True, True))
-                else: # The second of the split pair
-                    name = self.data.params[f"pd303_mc.loadIncreInfo.hall1IncreInfo.ch{split_reference}Info.chName"]
-                name = f'{name} (circuit {x})'
-            # Add normal circuits and the individual split circuits. We don't auto_enable individual split circuits
-            circuits.append(self._sensorsCircuit(client, x, name, False, not is_split))
         return [
             QuotaScheduledStatusSensorEntity(client, self, 60), # Refresh Quota All every 60 seconds so settings changed in app are reflected here
             InWattsSensorEntity(client, self, "'wattInfo.gridWatt'", const.AC_IN_POWER).with_energy(),
@@ -63,9 +52,6 @@ class SmartHomePanel2(BaseDevice):
                 .with_icon("mdi:flash-alert"),
             *[CyclesSensorEntity(client, self, f"'pd303_mc.masterIncreInfo.masterRly{x}Cnt'", const.RELAY_N_OPERATION_COUNT % x, False)
                 .with_icon('mdi:cog-clockwise') for x in range(1,5)],
-            *[self._sensorsBattery(client, x, self.data.params[f'pd303_mc.backupIncreInfo.ch{x}Info.backupIsReady']) for x in range(1,4)],
-            *[self._sensorsBatteryPower(client, x, self.data.params[f'pd303_mc.backupIncreInfo.ch{x}Info.backupIsReady']) for x in range(1,4)],
-            *circuits,
         ]
 
     def numbers(self, client: EcoflowApiClient) -> list[BaseNumberEntity]:
@@ -141,16 +127,6 @@ class SmartHomePanel2(BaseDevice):
         ]
 
     def switches(self, client: EcoflowApiClient) -> list[BaseSwitchEntity]:
-       # Find all split-phase circuits
-        circuits = []
-        for x in range(1,13):
-            name: str = self.data.params[f"pd303_mc.loadIncreInfo.hall1IncreInfo.ch{x}Info.chName"]
-            is_split: bool = self.data.params[f'pd303_mc.loadIncreInfo.hall1IncreInfo.ch{x}Info.splitphase.linkMark']
-            split_reference: int = self.data.params[f'pd303_mc.loadIncreInfo.hall1IncreInfo.ch{x}Info.splitphase.linkCh']
-
-            if not is_split or x < split_reference:
-                circuits.append(self._switchesCircuits(client, x, name, is_split))
-
         return [
             EnabledEntity(
                 client,
@@ -179,15 +155,6 @@ class SmartHomePanel2(BaseDevice):
             )
             .with_category(EntityCategory.CONFIG)
             .with_icon("mdi:weather-lightning"),
-            *[self._switchesBatteryEnabled(client,
-                                               x,
-                                               self.data.params[f'pd303_mc.backupIncreInfo.ch{x}Info.backupIsReady']
-                                               ) for x in range(1,4)],
-            *[self._switchesBatteryForceCharge(client,
-                                               x,
-                                               self.data.params[f'pd303_mc.backupIncreInfo.ch{x}Info.backupIsReady']
-                                               ) for x in range(1,4)],
-            *circuits,
         ]
 
     def selects(self, client: EcoflowApiClient) -> list[BaseSelectEntity]:
@@ -221,6 +188,57 @@ class SmartHomePanel2(BaseDevice):
             ).with_icon("mdi:generator-mobile"),
         ]
 
+    def entity_factories(self, client: EcoflowApiClient) -> list[EntityFactory]:
+        # circuit names, split-phase pairs and connected batteries are only known from the data
+        circuit_keys = tuple(
+            f"{CIRCUIT_INFO % x}.{key}"
+            for x in range(1,13)
+            for key in ("chName", "splitphase.linkMark", "splitphase.linkCh")
+        )
+        battery_keys = tuple(BACKUP_IS_READY % x for x in range(1,4))
+        return [
+            EntityFactory(Platform.SENSOR, circuit_keys, lambda params: self._sensorsCircuits(client, params)),
+            EntityFactory(Platform.SWITCH, circuit_keys, lambda params: self._switchesCircuitsAll(client, params)),
+            EntityFactory(Platform.SENSOR, battery_keys, lambda params: [
+                *[self._sensorsBattery(client, x, params[BACKUP_IS_READY % x]) for x in range(1,4)],
+                *[self._sensorsBatteryPower(client, x, params[BACKUP_IS_READY % x]) for x in range(1,4)],
+            ]),
+            EntityFactory(Platform.SWITCH, battery_keys, lambda params: [
+                *[self._switchesBatteryEnabled(client, x, params[BACKUP_IS_READY % x]) for x in range(1,4)],
+                *[self._switchesBatteryForceCharge(client, x, params[BACKUP_IS_READY % x]) for x in range(1,4)],
+            ]),
+        ]
+
+    def _sensorsCircuits(self, client: EcoflowApiClient, params: Mapping[str, Any]) -> list[BaseSensorEntity]:
+        # Find all split-phase circuits
+        circuits = []
+        for x in range(1,13):
+            name: str = params[f"{CIRCUIT_INFO % x}.chName"]
+            is_split: bool = params[f"{CIRCUIT_INFO % x}.splitphase.linkMark"]
+            split_reference: int = params[f"{CIRCUIT_INFO % x}.splitphase.linkCh"]
+
+            if is_split:
+                if x < split_reference: # The first of the split pair
+                    # Add our combined split circuit
+                    circuits.append(self._sensorsCircuit(client, x, name, True, True))
+                else: # The second of the split pair
+                    name = params[f"{CIRCUIT_INFO % split_reference}.chName"]
+                name = f'{name} (circuit {x})'
+            # Add normal circuits and the individual split circuits. We don't auto_enable individual split circuits
+            circuits.append(self._sensorsCircuit(client, x, name, False, not is_split))
+        return circuits
+
+    def _switchesCircuitsAll(self, client: EcoflowApiClient, params: Mapping[str, Any]) -> list[BaseSwitchEntity]:
+        circuits = []
+        for x in range(1,13):
+            name: str = params[f"{CIRCUIT_INFO % x}.chName"]
+            is_split: bool = params[f"{CIRCUIT_INFO % x}.splitphase.linkMark"]
+            split_reference: int = params[f"{CIRCUIT_INFO % x}.splitphase.linkCh"]
+
+            if not is_split or x < split_reference:
+                circuits.append(self._switchesCircuits(client, x, name, is_split))
+        return circuits
+
     def _switchesBatteryEnabled(self, client: EcoflowApiClient, index: int, enabled: bool) -> BaseSelectEntity:
         return EnabledEntity(
             client,
@@ -312,25 +330,4 @@ class SmartHomePanel2(BaseDevice):
 
     def _prepare_data(self, raw_data) -> dict[str, any]:
         res = super()._prepare_data(raw_data)
-        new_params = {}
-
-        if "param" in res:
-            for k, v in res["param"].items():
-                new_params[f"{k}"] = v
-
-        if "params" in res:
-            for k, v in res["params"].items():
-                new_params[f"{k}"] = v
-
-        for k, v in res.items():
-            if k != "param" and k != "params":
-                new_params[f"{k}"] = v
-
-        new_params2 = {}
-        for k, v in new_params.items():
-            new_params2[k] = v
-            if isinstance(v, dict):
-                for k2, v2 in v.items():
-                    new_params2[f"{k}.{k2}"] = v2
-
-        return {"params": new_params2, "raw_data": res}
+        return {"params": PLAIN_FLATTENER.flatten(res), "raw_data": res}
@@ -0,0 +1,80 @@
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.util import dt
+
+from .data_holder import BoundFifoList
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def command_key(raw: dict[str, Any] | None) -> str:
+    if not raw:
+        return "-"
+    if "cmdFunc" in raw and "cmdId" in raw:
+        return f"{raw['cmdFunc']}_{raw['cmdId']}"
+    for key in ("operateType", "cmdCode", "typeCode"):
+        if key in raw:
+            return str(raw[key])
+    return "-"
+
+
+class DeviceTracer:
+    """
+    Per device trace of raw frames and decoded fields.
+
+    Callers must check `enabled` before calling `record`, so that a disabled
+    tracer costs a single attribute lookup on the decode path.
+    """
+
+    def __init__(
+        self,
+        sn: str,
+        enabled: bool = False,
+        sample_every: int = 1,
+        commands: str = "",
+        maxlen: int = 50,
+    ):
+        self.sn = sn
+        self.enabled = enabled
+        self.sample_every = max(sample_every, 1)
+        self.commands = {c.strip() for c in commands.split(",") if c.strip()}
+        self.frames = BoundFifoList[dict[str, Any]](maxlen)
+        self.__counters: dict[str, int] = {}
+
+    def wants(self, command: str) -> bool:
+        if self.commands and command not in self.commands:
+            return False
+        count = self.__counters.get(command, 0)
+        self.__counters[command] = count + 1
+        return count % self.sample_every == 0
+
+    def record(
+        self,
+        command: str,
+        raw: bytes | None,
+        fields: Any | Callable[[], Any] = None,
+        topic: str | None = None,
+    ):
+        if not self.wants(command):
+            return
+        if callable(fields):
+            fields = fields()
+
+        frame = {
+            "time": dt.utcnow(),
+            "topic": topic,
+            "command": command,
+            "raw": raw.hex() if raw else None,
+            "fields": fields,
+        }
+        self.frames.append(frame)
+        _LOGGER.info(
+            "[%s] %s %s raw=%s fields=%s",
+            self.sn,
+            topic,
+            command,
+            frame["raw"],
+            fields,
+        )
@@ -0,0 +1,124 @@
+import datetime
+import logging
+from collections.abc import Callable, Sequence, Set
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_track_time_interval
+
+from .data_holder import EcoflowDataHolder
+
+_LOGGER = logging.getLogger(__name__)
+
+MAX_SENSORS = 100
+SENSORS_PER_SCAN = 10
+SCAN_INTERVAL = datetime.timedelta(seconds=60)
+
+# values a sensor can show, nested objects and lists are left to diagnostics
+_SCALARS = (bool, int, float, str)
+
+
+def _params_key(mqtt_key: str) -> str:
+    # "'a.b'[0]" and "a.b[0]" read the params key "a.b"
+    return mqtt_key.split("[", 1)[0].strip("'")
+
+
+class UnmappedKeys:
+    """
+    Disabled diagnostic sensors for the params keys no entity of a device reads.
+
+    Opt-in per device. Every SCAN_INTERVAL the params keys are compared with
+    the keys of the entities built for the device, and sensors are created
+    for unseen scalar values: at most SENSORS_PER_SCAN per scan and
+    MAX_SENSORS per device, so a device reporting hundreds of fields doesn't
+    flood the entity registry. Nothing runs per frame, scans are skipped
+    while the key count didn't change.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        sn: str,
+        holder: EcoflowDataHolder,
+        mapped_keys: Set[str],
+        enabled: bool,
+    ):
+        self.enabled = enabled
+        self.__hass = hass
+        self.__sn = sn
+        self.__holder = holder
+        self.__mapped_keys = mapped_keys
+        self.__build: Callable[[str, Any], Entity] | None = None
+        self.__add: Callable[[Sequence[Entity]], None] | None = None
+        self.__unsub: Callable[[], None] | None = None
+        self.__key_count = -1
+        self.created: list[str] = []
+        # unmapped keys waiting for the next scan or over the cap
+        self.waiting = 0
+
+    @callback
+    def start(
+        self,
+        build: Callable[[str, Any], Entity],
+        add_entities: Callable[[Sequence[Entity]], None],
+    ):
+        if not self.enabled or self.__unsub is not None:
+            return
+        self.__build = build
+        self.__add = add_entities
+        self.__unsub = async_track_time_interval(
+            self.__hass, self.__scan, SCAN_INTERVAL
+        )
+
+    @callback
+    def stop(self):
+        if self.__unsub is not None:
+            self.__unsub()
+            self.__unsub = None
+
+    @callback
+    def __scan(self, _now=None):
+        params = self.__holder.params
+        if len(params) == self.__key_count:
+            return
+        self.__key_count = len(params)
+
+        mapped = {_params_key(key) for key in self.__mapped_keys}
+        mapped.update(self.created)
+        new_keys = sorted(
+            key
+            for key, value in params.items()
+            if key not in mapped and isinstance(value, _SCALARS)
+        )
+        batch = new_keys[: min(SENSORS_PER_SCAN, MAX_SENSORS - len(self.created))]
+        self.waiting = len(new_keys) - len(batch)
+        if batch:
+            entities = []
+            for key in batch:
+                try:
+                    entities.append(self.__build(key, params[key]))
+                except Exception as error:
+                    _LOGGER.error("Error building diagnostic sensor %s: %s", key, error)
+                self.created.append(key)
+            self.__add(entities)
+
+        if len(self.created) >= MAX_SENSORS:
+            if self.waiting:
+                _LOGGER.info(
+                    "%s: %d diagnostic sensors created, %d more keys are only in diagnostics",
+                    self.__sn,
+                    len(self.created),
+                    self.waiting,
+                )
+            self.stop()
+        elif self.waiting:
+            # the rest goes out with the next scans
+            self.__key_count = -1
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "created": len(self.created),
+            "waiting": self.waiting,
+        }
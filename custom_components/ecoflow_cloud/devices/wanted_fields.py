@@ -0,0 +1,86 @@
+import collections
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from google.protobuf.descriptor import Descriptor
+from google.protobuf.message import Message as ProtoMessageRaw
+
+
+class WantedFields:
+    """
+    Params keys read by the enabled entities of a device.
+
+    Entities register their keys when they are added to hass and unregister
+    when removed, so enabling or disabling an entity in the registry (which
+    reloads it) updates the set. Protobuf decoders use it to convert only the
+    fields some entity reads. Until the first entity registers, or when
+    disabled (diagnostic mode), every field is converted.
+    """
+
+    def __init__(self, enabled: bool, on_change: Callable[[], None] | None = None):
+        self.enabled = enabled
+        self.__on_change = on_change
+        self.__counts = collections.Counter[str]()
+        # immutable copy, replaced on every change
+        self.__keys = frozenset[str]()
+        self.__fields: dict[tuple[str, str], frozenset[str]] = {}
+
+    def add(self, keys: Iterable[str]):
+        self.__counts.update(keys)
+        self.__changed()
+
+    def remove(self, keys: Iterable[str]):
+        self.__counts.subtract(keys)
+        self.__changed()
+
+    def __changed(self):
+        keys = frozenset(key for key, count in self.__counts.items() if count > 0)
+        if keys == self.__keys:
+            return
+        self.__keys = keys
+        self.__fields = {}
+        if self.__on_change is not None:
+            self.__on_change()
+
+    def fields(
+        self,
+        descriptor: Descriptor,
+        prefix: str = "",
+        sep: str = ".",
+        json_names: bool = False,
+    ) -> frozenset[str] | None:
+        """Names of the top level fields of `descriptor` producing a wanted key."""
+        keys = self.__keys
+        if not self.enabled or not keys:
+            return None
+
+        cache = self.__fields
+        cache_key = (descriptor.full_name, prefix)
+        result = cache.get(cache_key)
+        if result is None:
+            names = set[str]()
+            for field in descriptor.fields:
+                key = prefix + (field.json_name if json_names else field.name)
+                branch = key + sep
+                if key in keys or any(k.startswith(branch) for k in keys):
+                    names.add(field.name)
+            result = cache[cache_key] = frozenset(names)
+        return result
+
+    def prune(
+        self,
+        message: ProtoMessageRaw,
+        prefix: str = "",
+        sep: str = ".",
+        json_names: bool = False,
+    ) -> ProtoMessageRaw:
+        """Clear the fields of a decoded message no enabled entity reads."""
+        names = self.fields(message.DESCRIPTOR, prefix, sep, json_names)
+        if names is not None:
+            for field, _ in message.ListFields():
+                if field.name not in names:
+                    message.ClearField(field.name)
+        return message
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"enabled": self.enabled, "keys": len(self.__keys)}
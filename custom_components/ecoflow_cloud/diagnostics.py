@@ -30,6 +30,28 @@ async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigE
             'get':       [dict(sorted(k.items())) for k in device.data.get],
             'get_reply': [dict(sorted(k.items())) for k in device.data.get_reply],
             'raw_data': device.data.raw_data,
+            'trace':     list(device.tracer.frames),
+            'commands':  device.command_tracker.as_dict(),
+            'frames':    {
+                **device.frame_cache.as_dict(),
+                'unchanged': device.data.unchanged_frames,
+            },
+            'wanted':    device.wanted.as_dict(),
+            'refresh':   {
+                **device.coordinator.adaptive.as_dict(),
+                'offline': device.coordinator.offline,
+            },
+            'discovery': device.discovery.as_dict(),
+            'unmapped':  device.unmapped_keys.as_dict(),
         }
         values["EcoFlow"].append(value)
+    if client.mqtt_client is not None:
+        values["mqtt"] = {
+            "publish": client.mqtt_client.publish_scheduler.as_dict(),
+            "connection": client.mqtt_client.reconnect_supervisor.as_dict(),
+            "subscriptions": client.mqtt_client.topics(),
+        }
+    if client.quota_scheduler is not None:
+        values["quota"] = client.quota_scheduler.as_dict()
+    values["startup"] = client.startup_metrics.as_dict(client.devices.values())
     return values
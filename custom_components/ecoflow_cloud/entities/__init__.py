@@ -18,6 +18,7 @@ from ..devices import (
     BaseDevice,
     EcoflowDeviceUpdateCoordinator,
 )
+from .state_filter import StateFilter
 
 
 class EcoFlowAbstractEntity(CoordinatorEntity[EcoflowDeviceUpdateCoordinator]):
@@ -105,6 +106,7 @@ class EcoFlowDictEntity(EcoFlowAbstractEntity):
         super().__init__(client, device, title, mqtt_key)
 
         self.__mqtt_key = mqtt_key
+        device.mapped_keys.add(mqtt_key)
         self._mqtt_key_adopted = self._adopt_json_key(mqtt_key)
         self._mqtt_key_expr = jp.parse(self._mqtt_key_adopted)
         self._multiple_value_sum = False
@@ -120,6 +122,7 @@ class EcoFlowDictEntity(EcoFlowAbstractEntity):
 
     def attr(self, mqtt_key: str, title: str, default: Any) -> EcoFlowDictEntity:
         self.__attributes_mapping[mqtt_key] = title
+        self._device.mapped_keys.add(mqtt_key)
         self.__attrs[title] = default
         return self
 
@@ -133,6 +136,10 @@ class EcoFlowDictEntity(EcoFlowAbstractEntity):
     def mqtt_key(self):
         return self.__mqtt_key
 
+    def _params_keys(self) -> list[str]:
+        """Params keys this entity reads."""
+        return [self.__mqtt_key, *self.__attributes_mapping]
+
     @property
     def auto_enable(self):
         return self._auto_enable
@@ -145,10 +152,23 @@ class EcoFlowDictEntity(EcoFlowAbstractEntity):
         await super().async_added_to_hass()
         # d = self._device.data.params_observable().subscribe(self._updated)
         # self.async_on_remove(d.dispose)
+        keys = self._params_keys()
+        self._device.wanted.add(keys)
+        self.async_on_remove(lambda: self._device.wanted.remove(keys))
+        self.async_on_remove(self.coordinator.async_add_data_entity(self))
+
+    @property
+    def available(self) -> bool:
+        return super().available and not self.coordinator.offline
 
     def _handle_coordinator_update(self) -> None:
         if self.coordinator.data.changed:
-            self._updated(self.coordinator.data.data_holder.params)
+            self._updated(self.coordinator.data.params)
+        else:
+            self._handle_unchanged_update()
+
+    def _handle_unchanged_update(self):
+        pass
 
     def _updated(self, data: dict[str, Any]):
         # update attributes
@@ -176,7 +196,7 @@ class EcoFlowDictEntity(EcoFlowAbstractEntity):
                 for v in values[1:]:
                     total += v.value
             if self._update_value(total):
-                self.schedule_update_ha_state()
+                self.coordinator.async_schedule_state_write(self)
 
     @property
     def extra_state_attributes(self) -> Mapping[str, Any] | None:
@@ -209,10 +229,13 @@ class EcoFlowBaseCommandEntity[_CommandArg](EcoFlowDictEntity):
     ):
         super().__init__(client, device, mqtt_key, title, enabled, auto_enable)
         self._command = command
+        self._command_arity = (
+            len(inspect.signature(command).parameters) if command else 0
+        )
 
     def command_dict(self, value: _CommandArg) -> dict[str, Any] | Message | None:
         if self._command:
-            p_count = len(inspect.signature(self._command).parameters)
+            p_count = self._command_arity
             if p_count == 1:
                 command = cast(
                     Callable[[_CommandArg], dict[str, Any] | Message], self._command
@@ -228,9 +251,31 @@ class EcoFlowBaseCommandEntity[_CommandArg](EcoFlowDictEntity):
         else:
             return None
 
-    def send_set_message(self, target_value: Any, command: dict | Message):
+    def send_set_message(
+        self,
+        target_value: Any,
+        command: dict | Message,
+        previous: dict[str, Any] | None = None,
+    ):
         self._client.send_set_message(
-            self._device.device_info.sn, {self._mqtt_key_adopted: target_value}, command
+            self._device.device_info.sn,
+            {self._mqtt_key_adopted: target_value},
+            command,
+            previous,
+        )
+
+    def queue_set_message(self, target_value: Any, command_value: _CommandArg):
+        # the target state shows right away like for send_set_message,
+        # last write wins: only the final value of a burst is built and sent
+        previous = self._device.data.update_to_target_state(
+            {self._mqtt_key_adopted: target_value}
+        )
+        self._device.commands.submit(
+            self._mqtt_key_adopted,
+            lambda burst_previous: self.send_set_message(
+                target_value, self.command_dict(command_value), burst_previous
+            ),
+            previous,
         )
 
 
@@ -263,14 +308,46 @@ class BaseNumberEntity(NumberEntity, EcoFlowBaseCommandEntity[int]):
             return False
 
 
+_NO_VALUE = object()
+
+
 class BaseSensorEntity(SensorEntity, EcoFlowDictEntity):
+    __state_filter: StateFilter | None = None
+    __pending_value: Any = _NO_VALUE
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        # device class and unit may be changed by the device definitions after __init__
+        self.__state_filter = StateFilter.for_sensor(
+            self._device.device_data.options,
+            self.device_class,
+            self.native_unit_of_measurement,
+        )
+
     def _update_value(self, val: Any) -> bool:
         if self._attr_native_value != val:
+            state_filter = self.__state_filter
+            if state_filter is not None:
+                if not state_filter.accept(self._attr_native_value, val):
+                    self.__pending_value = val
+                    return False
+                state_filter.written()
+            self.__pending_value = _NO_VALUE
             self._attr_native_value = val
             return True
         else:
+            self.__pending_value = _NO_VALUE
             return False
 
+    def _handle_unchanged_update(self):
+        # flush a value held back by the deadband once it gets too old
+        if self.__pending_value is _NO_VALUE or not self.__state_filter.stale():
+            return
+        self._attr_native_value = self.__pending_value
+        self.__pending_value = _NO_VALUE
+        self.__state_filter.written()
+        self.coordinator.async_schedule_state_write(self)
+
 
 class BaseSwitchEntity[_CommandArg](
     SwitchEntity, EcoFlowBaseCommandEntity[_CommandArg]
@@ -0,0 +1,56 @@
+import threading
+import time
+
+
+class EnergyAccumulator:
+    """
+    Integrates power samples (W) into energy (kWh) at frame rate.
+
+    Samples are timestamped with the monotonic clock, so wall clock jumps
+    don't add or lose energy. Like the "left" method of the IntegrationSensor
+    it replaces, the previous sample holds until the next one and negative
+    power counts. Devices only report changed values, so `tick` integrates
+    the last known power up to now and `pause` stops integrating while the
+    device is gone.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__total = 0.0
+        self.__last_time: float | None = None
+        self.__last_power = 0.0
+        self.samples = 0
+
+    @property
+    def total(self) -> float:
+        return self.__total
+
+    def add(self, power: float, now: float | None = None):
+        if now is None:
+            now = time.monotonic()
+        with self.__lock:
+            self.__integrate(now)
+            self.__last_time = now
+            self.__last_power = power
+            self.samples += 1
+
+    def tick(self, now: float | None = None):
+        if now is None:
+            now = time.monotonic()
+        with self.__lock:
+            self.__integrate(now)
+
+    def pause(self):
+        with self.__lock:
+            self.__last_time = None
+
+    def restore(self, total: float):
+        with self.__lock:
+            self.__total += total
+
+    def __integrate(self, now: float):
+        if self.__last_time is None or now <= self.__last_time:
+            return
+        # W * s -> kWh
+        self.__total += self.__last_power * (now - self.__last_time) / 3_600_000
+        self.__last_time = now
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from homeassistant.components.sensor import SensorDeviceClass
+
+from ..device_data import DeviceOptions
+
+# deadbands are configured in W / V / A, entities may report in other units
+_UNIT_SCALE = {
+    "mV": 1000.0,
+    "mA": 1000.0,
+    "kW": 0.001,
+}
+
+
+class StateFilter:
+    """
+    Decides if a changed sensor value is worth a state write.
+
+    A value is written when it moved more than the absolute or relative
+    deadband and at least `min_interval` seconds passed since the last write.
+    Changes from or to zero (something switched on/off) are always written,
+    and a suppressed value is flushed after `max_staleness` seconds.
+    """
+
+    def __init__(
+        self,
+        deadband: float,
+        relative: float,
+        min_interval: float,
+        max_staleness: float,
+    ):
+        self.deadband = deadband
+        self.relative = relative
+        self.min_interval = min_interval
+        self.max_staleness = max_staleness
+        self.__written_time = 0.0
+
+    @staticmethod
+    def for_sensor(
+        options: DeviceOptions, device_class: Any, unit: str | None
+    ) -> StateFilter | None:
+        if device_class == SensorDeviceClass.POWER:
+            deadband = options.power_deadband
+        elif device_class == SensorDeviceClass.VOLTAGE:
+            deadband = options.voltage_deadband
+        elif device_class == SensorDeviceClass.CURRENT:
+            deadband = options.current_deadband
+        else:
+            return None
+
+        if not (deadband or options.relative_deadband or options.min_write_interval):
+            return None
+        return StateFilter(
+            deadband * _UNIT_SCALE.get(unit, 1.0),
+            options.relative_deadband / 100,
+            options.min_write_interval,
+            options.max_staleness,
+        )
+
+    def accept(self, written: Any, value: Any) -> bool:
+        if not isinstance(written, (int, float)) or not isinstance(value, (int, float)):
+            return True
+        if (written == 0) != (value == 0):
+            return True
+        age = time.monotonic() - self.__written_time
+        if age >= self.max_staleness:
+            return True
+        if age < self.min_interval:
+            return False
+        return abs(value - written) > max(self.deadband, abs(written) * self.relative)
+
+    def stale(self) -> bool:
+        return time.monotonic() - self.__written_time >= self.max_staleness
+
+    def written(self):
+        self.__written_time = time.monotonic()
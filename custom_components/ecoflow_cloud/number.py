@@ -3,7 +3,7 @@ from typing import Any, Callable
 from homeassistant.components.number import NumberMode
 from homeassistant.components.sensor import SensorDeviceClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import PERCENTAGE, UnitOfPower, UnitOfTemperature
+from homeassistant.const import PERCENTAGE, Platform, UnitOfPower, UnitOfTemperature
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
@@ -19,6 +19,7 @@ async def async_setup_entry(
     client: EcoflowApiClient = hass.data[ECOFLOW_DOMAIN][entry.entry_id]
     for sn, device in client.devices.items():
         async_add_entities(device.numbers(client))
+        device.discovery.platform_ready(Platform.NUMBER, async_add_entities)
 
 
 class ValueUpdateEntity(BaseNumberEntity):
@@ -28,7 +29,7 @@ class ValueUpdateEntity(BaseNumberEntity):
     async def async_set_native_value(self, value: float):
         if self._command:
             ival = int(value)
-            self.send_set_message(ival, self.command_dict(ival))
+            self.queue_set_message(ival, ival)
 
 
 class ChargingPowerEntity(ValueUpdateEntity):
@@ -73,7 +74,7 @@ class DeciChargingPowerEntity(ChargingPowerEntity):
     async def async_set_native_value(self, value: float):
         if self._command:
             ival = int(value * 10)
-            self.send_set_message(ival, self.command_dict(ival))
+            self.queue_set_message(ival, ival)
 
 
 class AcChargingPowerInAmpereEntity(ValueUpdateEntity):
@@ -85,7 +86,7 @@ class AcChargingPowerInAmpereEntity(ValueUpdateEntity):
 
     async def async_set_native_value(self, value: int):
         if self._command:
-            self.send_set_message(value, self.command_dict(value))
+            self.queue_set_message(value, value)
 
 
 class MinMaxLevelEntity(ValueUpdateEntity):
@@ -134,6 +135,9 @@ class BatteryBackupLevel(MinMaxLevelEntity):
         self._max_key = max_key
         self._gap_min = gap_min
 
+    def _params_keys(self) -> list[str]:
+        return [*super()._params_keys(), self._min_key, self._max_key]
+
     def _updated(self, data: dict[str, Any]):
         if self._min_key in data:
             self._attr_native_min_value = int(data[self._min_key]) + self._gap_min  # min + 5%
@@ -1,6 +1,7 @@
 from typing import Any, Callable
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -17,6 +18,7 @@ async def async_setup_entry(
     client: EcoflowApiClient = hass.data[ECOFLOW_DOMAIN][entry.entry_id]
     for sn, device in client.devices.items():
         async_add_entities(device.selects(client))
+        device.discovery.platform_ready(Platform.SELECT, async_add_entities)
 
 
 class DictSelectEntity(BaseSelectEntity[int]):
@@ -65,7 +67,7 @@ class DictSelectEntity(BaseSelectEntity[int]):
     def select_option(self, option: str) -> None:
         if self._command:
             val = self._options_dict[option]
-            self.send_set_message(val, self.command_dict(val))
+            self.queue_set_message(val, val)
 
 
 class TimeoutDictSelectEntity(DictSelectEntity):
@@ -1,7 +1,7 @@
 import enum
 import logging
 import struct
-from datetime import timedelta
+import time
 from typing import Any, Mapping, OrderedDict, override
 
 from homeassistant.components.binary_sensor import ( # pyright: ignore[reportMissingImports]
@@ -9,14 +9,16 @@ from homeassistant.components.binary_sensor import ( # pyright: ignore[reportMis
     BinarySensorEntity,
 )
 from homeassistant.components.sensor import ( # pyright: ignore[reportMissingImports]
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
+    SensorExtraStoredData,
     SensorStateClass,
 )
-from homeassistant.components.integration.sensor import IntegrationSensor # pyright: ignore[reportMissingImports]
 from homeassistant.config_entries import ConfigEntry # pyright: ignore[reportMissingImports]
 from homeassistant.const import ( # pyright: ignore[reportMissingImports]
     PERCENTAGE,
+    Platform,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
     UnitOfEnergy,
@@ -25,7 +27,7 @@ from homeassistant.const import ( # pyright: ignore[reportMissingImports]
     UnitOfTemperature,
     UnitOfTime,
 )
-from homeassistant.core import HomeAssistant # pyright: ignore[reportMissingImports]
+from homeassistant.core import HomeAssistant, callback # pyright: ignore[reportMissingImports]
 from homeassistant.helpers.entity import EntityCategory # pyright: ignore[reportMissingImports]
 from homeassistant.helpers.entity_platform import AddEntitiesCallback # pyright: ignore[reportMissingImports]
 from homeassistant.util import dt # pyright: ignore[reportMissingImports]
@@ -33,9 +35,11 @@ from homeassistant.util import dt # pyright: ignore[reportMissingImports]
 from . import (
     ATTR_MQTT_CONNECTED,
     ATTR_QUOTA_REQUESTS,
+    ATTR_REFRESH_INTERVAL,
     ATTR_STATUS_DATA_LAST_UPDATE,
     ATTR_STATUS_PHASE,
     ATTR_STATUS_RECONNECTS,
+    ATTR_STATUS_RESTORED,
     ATTR_STATUS_SN,
     ECOFLOW_DOMAIN,
 )
@@ -46,16 +50,19 @@ from .entities import (
     EcoFlowAbstractEntity,
     EcoFlowDictEntity,
 )
+from .entities.energy_accumulator import EnergyAccumulator
 
 _LOGGER = logging.getLogger(__name__)
 
+ENERGY_PUBLISH_INTERVAL_SEC = 60
+
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ):
     client: EcoflowApiClient = hass.data[ECOFLOW_DOMAIN][entry.entry_id]
-    for sn, device in client.devices.items():
-        sensors = device.sensors(client)
+
+    def add_sensors(sensors):
         # Add regular sensors
         async_add_entities(sensors)
 
@@ -65,6 +72,16 @@ async def async_setup_entry(
         )
         async_add_entities(map(lambda s: s.energy_sensor(), integralSensors))
 
+    for sn, device in client.devices.items():
+        add_sensors(device.sensors(client))
+        device.discovery.platform_ready(Platform.SENSOR, add_sensors)
+        device.unmapped_keys.start(
+            lambda key, value, device=device: UnmappedKeySensorEntity(
+                client, device, key, value
+            ),
+            async_add_entities,
+        )
+
 
 class MiscBinarySensorEntity(BinarySensorEntity, EcoFlowDictEntity):
     def _update_value(self, val: Any) -> bool:
@@ -103,6 +120,59 @@ class MiscSensorEntity(BaseSensorEntity):
     _attr_entity_category = EntityCategory.DIAGNOSTIC
 
 
+class UnmappedKeySensorEntity(SensorEntity, EcoFlowAbstractEntity):
+    """
+    Disabled diagnostic sensor for a params key no entity reads, typed by its
+    first value. Not evaluated on coordinator updates, only when the value
+    of its key changed.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self, client: EcoflowApiClient, device: BaseDevice, key: str, value: Any
+    ):
+        super().__init__(client, device, key, f"unmapped.{key}")
+        self.__key = key
+        if isinstance(value, bool):
+            self._attr_device_class = SensorDeviceClass.ENUM
+            self._attr_options = ["off", "on"]
+        elif isinstance(value, (int, float)):
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_key_listener(self.__key, self.__updated)
+        )
+        self.async_on_remove(self.coordinator.async_add_data_entity(self))
+        value = self.coordinator.holder.params.get(self.__key)
+        if value is not None:
+            self.__updated(value)
+
+    @property
+    def available(self) -> bool:
+        return super().available and not self.coordinator.offline
+
+    def _handle_coordinator_update(self) -> None:
+        pass
+
+    @callback
+    def __updated(self, value: Any):
+        if self.device_class == SensorDeviceClass.ENUM:
+            value = "on" if value else "off"
+        elif self.state_class is not None and (
+            isinstance(value, bool) or not isinstance(value, (int, float))
+        ):
+            # the key changed its type, a measurement can't show it
+            value = None
+        elif isinstance(value, str):
+            value = value[:255]
+        self._attr_native_value = value
+        self.coordinator.async_schedule_state_write(self)
+
+
 class LevelSensorEntity(BaseSensorEntity):
     _attr_device_class = SensorDeviceClass.BATTERY
     _attr_native_unit_of_measurement = PERCENTAGE
@@ -278,6 +348,13 @@ class WattsSensorEntity(BaseSensorEntity):
             return None
         return IntegralEnergySensorEntity(self, self._energy_enabled_default)
 
+    def _to_watts(self, val: Any) -> Any:
+        """Convert a raw params value to W."""
+        return val
+
+    def _update_value(self, val: Any) -> bool:
+        return super()._update_value(self._to_watts(val))
+
 
 class EnergySensorEntity(BaseSensorEntity):
     _attr_device_class = SensorDeviceClass.ENERGY
@@ -309,8 +386,8 @@ class CumulativeCapacitySensorEntity(CapacitySensorEntity):
 
 
 class DeciwattsSensorEntity(WattsSensorEntity):
-    def _update_value(self, val: Any) -> bool:
-        return super()._update_value(int(val) / 10)
+    def _to_watts(self, val: Any) -> Any:
+        return int(val) / 10
 
 
 class InWattsSensorEntity(WattsSensorEntity):
@@ -320,8 +397,8 @@ class InWattsSensorEntity(WattsSensorEntity):
 class InWattsSolarSensorEntity(InWattsSensorEntity):
     _attr_icon = "mdi:solar-power"
 
-    def _update_value(self, val: Any) -> bool:
-        return super()._update_value(int(val) / 10)
+    def _to_watts(self, val: Any) -> Any:
+        return int(val) / 10
 
 
 class InRawWattsSolarSensorEntity(InWattsSensorEntity):
@@ -329,8 +406,8 @@ class InRawWattsSolarSensorEntity(InWattsSensorEntity):
 
 
 class InRawTotalWattsSolarSensorEntity(InRawWattsSolarSensorEntity):
-    def _update_value(self, val: Any) -> bool:
-        return super()._update_value(int(val) / 1000)
+    def _to_watts(self, val: Any) -> Any:
+        return int(val) / 1000
 
 
 class InRawWattsAltSensorEntity(InWattsSensorEntity):
@@ -344,8 +421,8 @@ class OutWattsSensorEntity(WattsSensorEntity):
 class OutWattsDcSensorEntity(WattsSensorEntity):
     _attr_icon = "mdi:transmission-tower-export"
 
-    def _update_value(self, val: Any) -> bool:
-        return super()._update_value(int(val) / 10)
+    def _to_watts(self, val: Any) -> Any:
+        return int(val) / 10
 
 
 class InVoltSensorEntity(VoltSensorEntity):
@@ -444,6 +521,9 @@ class _OnlineStatus(enum.Enum):
     ONLINE = enum.auto()
 
 
+_OFFLINE_STATES = {_OnlineStatus.OFFLINE, _OnlineStatus.ASSUME_OFFLINE}
+
+
 class StatusSensorEntity(SensorEntity, EcoFlowAbstractEntity):
     _attr_entity_category = EntityCategory.DIAGNOSTIC
 
@@ -463,30 +543,58 @@ class StatusSensorEntity(SensorEntity, EcoFlowAbstractEntity):
         self._last_update = dt.utcnow().replace(
             year=2000, month=1, day=1, hour=0, minute=0, second=0
         )
-        self._skip_count = 0
-        self._offline_skip_count = int(
-            self.offline_barrier_sec / self.coordinator.update_interval.seconds
+        if self._device.data.restored:
+            # stored params are old data, not an update from the device
+            self._last_update = self._device.data.params_time
+        # base intervals without data, counted from the elapsed time since
+        # adaptive ticks can be shorter or longer than the base interval
+        self._skip_count: float = 0
+        self._previous_skip_count: float = 0
+        self._offline_skip_count = (
+            self.offline_barrier_sec / self.coordinator.base_interval.total_seconds()
         )
         self._attrs = OrderedDict[str, Any]()
         self._attrs[ATTR_STATUS_SN] = self._device.device_info.sn
         self._attrs[ATTR_STATUS_DATA_LAST_UPDATE] = None
         self._attrs[ATTR_MQTT_CONNECTED] = None
+        self._attrs[ATTR_REFRESH_INTERVAL] = None
+        self._attrs[ATTR_STATUS_RESTORED] = self._device.data.restored
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_status_listener(self._handle_coordinator_update)
+        )
 
     def _handle_coordinator_update(self) -> None:
         changed = False
         update_time = self.coordinator.data.data_holder.last_received_time()
         if self._last_update < update_time:
             self._last_update = max(update_time, self._last_update)
-            self._skip_count = 0
+            self._previous_skip_count = self._skip_count = 0
             self._actualize_attributes()
             changed = True
         else:
-            self._skip_count += 1
+            self._previous_skip_count = self._skip_count
+            self._skip_count += self.coordinator.tick_weight
+
+        interval = self.coordinator.update_interval.total_seconds()
+        if self._attrs[ATTR_REFRESH_INTERVAL] != interval:
+            self._attrs[ATTR_REFRESH_INTERVAL] = interval
+            changed = True
+        restored = self.coordinator.data.data_holder.restored
+        if self._attrs[ATTR_STATUS_RESTORED] != restored:
+            self._attrs[ATTR_STATUS_RESTORED] = restored
+            changed = True
 
+        online = self._online
         changed = self._actualize_status() or changed
+        if self._online != online:
+            # offline devices only keep this sensor evaluated
+            self.coordinator.async_set_offline(self._online in _OFFLINE_STATES)
 
         if changed:
-            self.schedule_update_ha_state()
+            self.coordinator.async_schedule_state_write(self)
 
     def _actualize_status(self) -> bool:
         changed = False
@@ -503,7 +611,7 @@ class StatusSensorEntity(SensorEntity, EcoFlowAbstractEntity):
                 self._actualize_attributes()
                 changed = True
         elif (
-            self._online not in {_OnlineStatus.OFFLINE, _OnlineStatus.ASSUME_OFFLINE}
+            self._online not in _OFFLINE_STATES
             and self._skip_count >= self._offline_skip_count
         ):
             self._online = _OnlineStatus.ASSUME_OFFLINE
@@ -554,11 +662,9 @@ class QuotaStatusSensorEntity(StatusSensorEntity):
             self._online != _OnlineStatus.ASSUME_OFFLINE
             and self._skip_count >= self._offline_skip_count
         ):
-            self.hass.async_create_background_task(
-                self._client.quota_all(self._device.device_info.sn), "get quota"
-            )
-            self._attrs[ATTR_QUOTA_REQUESTS] = self._attrs[ATTR_QUOTA_REQUESTS] + 1
-            changed = True
+            if self._client.request_quota(self._device.device_info.sn):
+                self._attrs[ATTR_QUOTA_REQUESTS] = self._attrs[ATTR_QUOTA_REQUESTS] + 1
+                changed = True
         elif self._online != _OnlineStatus.ONLINE and self._skip_count == 0:
             self._online = _OnlineStatus.ONLINE
             self._attr_native_value = "online"
@@ -584,10 +690,8 @@ class QuotaScheduledStatusSensorEntity(QuotaStatusSensorEntity):
         if quota_diff > (self.offline_barrier_sec):
             self._attr_native_value = "updating"
             self._quota_last_update = dt.utcnow()
-            self.hass.async_create_background_task(
-                self._client.quota_all(self._device.device_info.sn), "get quota"
-            )
-            self._attrs[ATTR_QUOTA_REQUESTS] = self._attrs[ATTR_QUOTA_REQUESTS] + 1
+            if self._client.request_quota(self._device.device_info.sn):
+                self._attrs[ATTR_QUOTA_REQUESTS] = self._attrs[ATTR_QUOTA_REQUESTS] + 1
             _LOGGER.debug("Reload quota for device %s", self._device.device_info.sn)
             changed = True
         else:
@@ -608,39 +712,109 @@ class ReconnectStatusSensorEntity(StatusSensorEntity):
         self._attrs[ATTR_STATUS_RECONNECTS] = 0
 
     def _actualize_status(self) -> bool:
-        time_to_reconnect = self._skip_count in self.CONNECT_PHASES
+        time_to_reconnect = any(
+            self._previous_skip_count < phase <= self._skip_count
+            for phase in self.CONNECT_PHASES
+        )
 
         if self._online == _OnlineStatus.ONLINE and time_to_reconnect:
-            self._attrs[ATTR_STATUS_RECONNECTS] = (
-                self._attrs[ATTR_STATUS_RECONNECTS] + 1
-            )
-            self._client.mqtt_client.reconnect()
+            # non-blocking; shared with other devices on the same connection
+            if self._client.mqtt_client.reconnect():
+                self._attrs[ATTR_STATUS_RECONNECTS] = (
+                    self._attrs[ATTR_STATUS_RECONNECTS] + 1
+                )
             return True
         else:
             return super()._actualize_status()
 
 
-class IntegralEnergySensorEntity(IntegrationSensor):
+class IntegralEnergySensorEntity(RestoreSensor, EcoFlowAbstractEntity):
+    """
+    Energy of a power sensor, integrated from every received frame.
+
+    Keeps the unique id of the IntegrationSensor based entity it replaces, so
+    its history continues. The total survives restarts and the state is
+    written at most every ENERGY_PUBLISH_INTERVAL_SEC. Between frames the
+    last power keeps counting on every coordinator tick, until the device
+    goes offline.
+    """
+
     _attr_device_class = SensorDeviceClass.ENERGY
     _attr_entity_category = EntityCategory.DIAGNOSTIC
     _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    # negative power counts down, as the IntegrationSensor did
+    _attr_state_class = SensorStateClass.TOTAL
     _attr_entity_registry_visible_default = False
 
     def __init__(self, base: WattsSensorEntity, enabled_default: bool = True):
         super().__init__(
-            base.coordinator.hass,
-            integration_method="left",
-            name=f"{base._device.device_info.name} {base._attr_name.replace(f'{const.POWER}', f' {const.ENERGY}')}",
-            round_digits=4,
-            source_entity=base.entity_id,
-            unique_id=f"{base._attr_unique_id}_energy",
-            unit_prefix="k",
-            unit_time="h",
-            max_sub_interval=timedelta(seconds=60),
+            base._client,
+            base._device,
+            base._attr_name.replace(const.POWER, const.ENERGY),
+            f"{base.mqtt_key}_energy",
         )
-        self.device_info = base.device_info
+        self._attr_unique_id = f"{base._attr_unique_id}_energy"
         self._attr_entity_registry_enabled_default = enabled_default and base.enabled_default
+        self.__base = base
+        self.__accumulator = EnergyAccumulator()
+        self.__published = 0.0
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        total = None
+        last_data = await self.async_get_last_sensor_data()
+        if last_data is not None and last_data.native_value is not None:
+            total = last_data.native_value
+        elif (last_state := await self.async_get_last_state()) is not None:
+            total = last_state.state
+        try:
+            restored = float(total) if total is not None else 0.0
+        except ValueError:
+            restored = 0.0
+        self.__accumulator.restore(restored)
+        self._attr_native_value = round(restored, 4)
+
+        keys = [self.__base.mqtt_key]
+        self._device.wanted.add(keys)
+        self.async_on_remove(lambda: self._device.wanted.remove(keys))
+        self.async_on_remove(self._device.data.add_params_listener(self.__on_params))
+        # only called while the device is offline
+        self.async_on_remove(
+            self.coordinator.async_add_status_listener(self.__accumulator.pause)
+        )
+
+    def __on_params(self, params: Mapping[str, Any]):
+        # event loop, every data frame
+        values = self.__base._mqtt_key_expr.find(params)
+        if len(values) != 1 and not (values and self.__base.multiple_value_sum_enabled()):
+            return
+        total = values[0].value
+        for v in values[1:]:
+            total += v.value
+        try:
+            power = float(self.__base._to_watts(total))
+        except (TypeError, ValueError):
+            return
+        self.__accumulator.add(power)
+
+    def _handle_coordinator_update(self) -> None:
+        self.__accumulator.tick()
+        value = round(self.__accumulator.total, 4)
+        now = time.monotonic()
+        if (
+            value != self._attr_native_value
+            and now - self.__published >= ENERGY_PUBLISH_INTERVAL_SEC
+        ):
+            self._attr_native_value = value
+            self.__published = now
+            self.coordinator.async_schedule_state_write(self)
+
+    @property
+    def extra_restore_state_data(self) -> SensorExtraStoredData:
+        # the live total, not the last published state
+        return SensorExtraStoredData(
+            round(self.__accumulator.total, 4), self.native_unit_of_measurement
+        )
 
 class SolarPowerSensorEntity(WattsSensorEntity):
     _attr_entity_category = None
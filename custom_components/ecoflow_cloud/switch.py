@@ -2,6 +2,7 @@ import logging
 from typing import Any, Callable
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -23,6 +24,7 @@ async def async_setup_entry(
     client: EcoflowApiClient = hass.data[ECOFLOW_DOMAIN][entry.entry_id]
     for sn, device in client.devices.items():
         async_add_entities(device.switches(client))
+        device.discovery.platform_ready(Platform.SWITCH, async_add_entities)
 
 
 class EnabledEntity(BaseSwitchEntity[int]):
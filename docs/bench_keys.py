@@ -0,0 +1,95 @@
+"""
+Key allocation benchmark for params flattening.
+
+Replays the params of the bundled diag/*.json dumps as decoded frames and
+compares building the keys with plain string formatting against the shared
+KeyTable used by devices/flatten.py. Timings include the tracemalloc overhead,
+so only compare them with each other.
+
+    python docs/bench_keys.py [frames]
+"""
+
+import gc
+import importlib.util
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+HISTORY = 20
+
+# load the module by path so the benchmark doesn't need Home Assistant installed
+spec = importlib.util.spec_from_file_location(
+    "flatten", ROOT / "custom_components/ecoflow_cloud/devices/flatten.py"
+)
+flatten = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(flatten)
+
+
+def load_frames() -> list[tuple[str, list[tuple[str, dict]]]]:
+    devices = []
+    for path in sorted((ROOT / "diag").glob("*.json")):
+        params = json.loads(path.read_text()).get("data", {}).get("params", {})
+        grouped: dict[str, dict] = {}
+        for key, value in params.items():
+            prefix, sep, field = key.rpartition(".")
+            grouped.setdefault(prefix + sep, {})[field] = value
+        devices.append((path.stem, list(grouped.items())))
+    return devices
+
+
+def decoded(frame: dict) -> dict:
+    # decoders hand over freshly allocated key strings on every frame
+    return {"".join(list(k)): v for k, v in frame.items()}
+
+
+def build_formatted(prefix: str, frame: dict) -> dict:
+    return {f"{prefix}{key}": value for key, value in frame.items()}
+
+
+def build_table(keys, prefix: str, frame: dict) -> dict:
+    return {keys.key(prefix, key): value for key, value in frame.items()}
+
+
+def run(name, build, devices, frames):
+    inputs = [
+        [(prefix, decoded(frame)) for prefix, frame in groups]
+        for _, groups in devices
+    ]
+    gc.collect()
+    tracemalloc.start()
+    history = []
+    start = time.perf_counter()
+    count = 0
+    for i in range(frames):
+        params = {}
+        for groups in inputs:
+            for prefix, frame in groups:
+                params.update(build(prefix, frame))
+                count += len(frame)
+        history.append(params)
+        del history[:-HISTORY]
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:10} {elapsed / count * 1e9:7.1f} ns/key"
+        f"  retained {current / 1024:8.1f} KiB  peak {peak / 1024:8.1f} KiB"
+    )
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    devices = load_frames()
+    keys = sum(len(frame) for _, groups in devices for _, frame in groups)
+    print(f"{len(devices)} dumps, {keys} keys per frame, {frames} frames, history {HISTORY}")
+
+    table = flatten.KeyTable()
+    run("formatted", build_formatted, devices, frames)
+    run("key table", lambda p, f: build_table(table, p, f), devices, frames)
+
+
+if __name__ == "__main__":
+    main()